@@ -1,11 +1,13 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
 from routes.auth import auth_bp
 from routes.patient import patient_bp
 from routes.admin import admin_bp
 from routes.ml import ml_bp
-from utils.db_config import init_db, close_db
+from utils.db_config import init_db
+from utils.jwt_cache import CachedJWTManager
+from utils.json_provider import OrjsonProvider
+from utils.compression import init_compression
 import os
 from dotenv import load_dotenv
 from datetime import timedelta
@@ -15,6 +17,10 @@ load_dotenv()
 
 app = Flask(__name__)
 
+# Serialize responses with orjson, without pretty-printing
+app.json = OrjsonProvider(app)
+app.json.compact = True
+
 # CORS configuration to prevent timeout issues
 CORS(app, 
      origins=['http://localhost:3000', 'http://127.0.0.1:3000'],
@@ -33,14 +39,14 @@ app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
 
 # JWT Manager
-jwt = JWTManager(app)
+jwt = CachedJWTManager(app)
+
+# Gzip JSON responses
+init_compression(app)
 
 # Initialize Database
 init_db(app)
 
-# Register database teardown
-app.teardown_appcontext(close_db)
-
 # Register Blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(patient_bp, url_prefix='/api/patient')
@@ -59,27 +65,15 @@ def health_check():
 def db_test():
     """Test database connection"""
     try:
-        from utils.db_config import get_db
-        from pymongo import MongoClient
+        from utils.db_config import get_db, get_mongo_client, get_db_name
         import os
         
-        # Test direct connection first
         mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/medicine_db')
         
+        # Test the shared pooled client first
         try:
-            client = MongoClient(mongo_uri)
-            # Handle different URI formats
-            if 'mongodb+srv://' in mongo_uri or mongo_uri.count('/') < 3:
-                # MongoDB Atlas or URI without database name
-                db_name = 'medicine_db'
-            else:
-                # Local MongoDB URI with database name
-                db_path = mongo_uri.split('/')[-1]
-                db_name = db_path.split('?')[0] if '?' in db_path else db_path
-                if not db_name:  # Empty string
-                    db_name = 'medicine_db'
-            
-            db_direct = client[db_name]
+            db_name = get_db_name()
+            db_direct = get_mongo_client()[db_name]
             db_direct.command('ping')
             direct_status = "success"
             direct_error = None
@@ -96,7 +90,7 @@ def db_test():
                 flask_error = "get_db() returned None"
             else:
                 db.command('ping')
-                user_count = db.users.count_documents({})
+                user_count = db.users.estimated_document_count()
                 flask_status = "success"
                 flask_error = None
         except Exception as e:
@@ -134,4 +128,6 @@ def internal_error(error):
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only; use gunicorn (see gunicorn.conf.py) in production
+    debug = os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true')
+    app.run(debug=debug, host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Script to prebuild the ML lookup snapshot (ml_assets/lookup.pkl)
+
+Re-run this whenever svc.pkl or any of the CSV datasets change.
+"""
+
+import sys
+import os
+import time
+import argparse
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.ml_model import MedicinePredictor, LOOKUP_ATTRS
+from utils.db_config import save_disease_lookups
+from dotenv import load_dotenv
+from flask import Flask
+
+# Load environment variables
+load_dotenv()
+
+def build_lookup_snapshot():
+    """Build the lookup maps from the CSV datasets and save them"""
+    print("🔨 Building ML lookup snapshot...")
+    
+    predictor = MedicinePredictor()
+    start = time.perf_counter()
+    predictor.load_model_and_data(use_snapshot=False)
+    print(f"✅ Lookup maps built from CSV in {time.perf_counter() - start:.3f}s")
+    
+    for attr in LOOKUP_ATTRS:
+        print(f"   {attr}: {len(getattr(predictor, attr))} entries")
+    
+    snapshot_path = predictor.save_lookup_snapshot()
+    print(f"💾 Saved snapshot to {snapshot_path}")
+    
+    # Check how long the snapshot takes to load
+    start = time.perf_counter()
+    reloaded = MedicinePredictor()
+    reloaded.load_model_and_data()
+    print(f"⚡ Snapshot loads in {time.perf_counter() - start:.3f}s")
+    
+    return predictor
+
+def publish_to_mongo(predictor):
+    """Upsert the per-disease lookups into the disease_lookups collection"""
+    print("\n📤 Publishing disease lookups to MongoDB...")
+    
+    lookups = [
+        {'disease': disease, **predictor.get_disease_info(disease)}
+        for disease in predictor.get_all_diseases()
+    ]
+    
+    # Create Flask app for context
+    app = Flask(__name__)
+    app.config['MONGO_URI'] = os.getenv('MONGO_URI', 'mongodb://localhost:27017/medicine_db')
+    with app.app_context():
+        count = save_disease_lookups(lookups)
+    
+    if count:
+        print(f"✅ Published {count} disease lookups")
+    else:
+        print("⚠️  No disease lookups written (check the MongoDB connection)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prebuild the ML lookup snapshot")
+    parser.add_argument('--mongo', action='store_true',
+                        help="also publish the per-disease lookups to the disease_lookups collection")
+    args = parser.parse_args()
+    
+    predictor = build_lookup_snapshot()
+    if args.mongo:
+        publish_to_mongo(predictor)
@@ -5,14 +5,15 @@ Script to create demo admin and test accounts for development and testing
 
 import sys
 import os
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.security import generate_password_hash
 
 # Add the backend directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils.db_config import create_user, get_user_by_email, get_db
-from pymongo import MongoClient
+from utils.db_config import create_users, get_existing_emails, get_user_by_email, get_db, get_mongo_client, get_db_name
+from utils.dates import utcnow
+from utils.passwords import hash_password
 from dotenv import load_dotenv
 from flask import Flask
 
@@ -23,6 +24,15 @@ load_dotenv()
 app = Flask(__name__)
 app.config['MONGO_URI'] = os.getenv('MONGO_URI', 'mongodb://localhost:27017/medicine_db')
 
+def hash_demo_password(password):
+    """Hash a demo password, with a cheaper pbkdf2 cost when DEMO_HASH_ITER is set"""
+    iterations = os.getenv('DEMO_HASH_ITER')
+    if iterations:
+        # Upgraded to argon2id on the account's first login
+        return generate_password_hash(password, method=f'pbkdf2:sha256:{int(iterations)}')
+    # Same argon2id hashing as real signups
+    return hash_password(password)
+
 def create_demo_accounts():
     """Create demo accounts for testing"""
     
@@ -71,37 +81,46 @@ def create_demo_accounts():
     created_count = 0
     
     with app.app_context():
-        for account in demo_accounts:
-            try:
-                # Check if user already exists
-                existing_user = get_user_by_email(account['email'])
-                if existing_user:
+        try:
+            # Check which accounts already exist with a single query
+            existing_emails = get_existing_emails(account['email'] for account in demo_accounts)
+            to_create = []
+            for account in demo_accounts:
+                if account['email'] in existing_emails:
                     print(f"⚠️  User {account['email']} already exists - skipping")
-                    continue
-                
-                # Create user data
-                user_data = {
+                else:
+                    to_create.append(account)
+            
+            # Password hashing is CPU-bound and releases the GIL, so hash in parallel
+            with ThreadPoolExecutor() as executor:
+                password_hashes = list(executor.map(
+                    hash_demo_password, [account['password'] for account in to_create]
+                ))
+            
+            # Create user data
+            users_data = [
+                {
                     'email': account['email'],
-                    'password_hash': generate_password_hash(account['password']),
+                    'password_hash': password_hash,
                     'first_name': account['first_name'],
                     'last_name': account['last_name'],
                     'role': account['role'],
-                    'profile': account['profile'],
-                    'created_at': datetime.utcnow(),
-                    'last_login': None,
-                    'is_active': True
+                    'profile': account['profile']
                 }
-                
-                # Create user
-                user_id = create_user(user_data)
-                if user_id:
-                    created_count += 1
+                for account, password_hash in zip(to_create, password_hashes)
+            ]
+            
+            # Create all missing users in one bulk insert
+            created = create_users(users_data) if users_data else {}
+            created_count = len(created)
+            for account in to_create:
+                if account['email'] in created:
                     print(f"✅ Created {account['role']} account: {account['email']} (password: {account['password']})")
                 else:
                     print(f"❌ Failed to create account: {account['email']}")
                     
-            except Exception as e:
-                print(f"❌ Error creating {account['email']}: {str(e)}")
+        except Exception as e:
+            print(f"❌ Error creating demo accounts: {str(e)}")
     
     print(f"\n🎉 Successfully created {created_count} demo accounts!")
     print("\nDemo Login Credentials:")
@@ -116,26 +135,15 @@ def test_database_connection():
     try:
         print("🔌 Testing database connection...")
         
-        mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/medicine_db')
-        client = MongoClient(mongo_uri)
-        
-        # Handle different URI formats
-        if 'mongodb+srv://' in mongo_uri or mongo_uri.count('/') < 3:
-            db_name = 'medicine_db'
-        else:
-            db_path = mongo_uri.split('/')[-1]
-            db_name = db_path.split('?')[0] if '?' in db_path else db_path
-            if not db_name:
-                db_name = 'medicine_db'
-        
-        db = client[db_name]
+        db_name = get_db_name()
+        db = get_mongo_client()[db_name]
         
         # Test the connection
         db.command('ping')
         
         print(f"✅ Connected to database: {db_name}")
-        print(f"📊 Current user count: {db.users.count_documents({})}")
-        print(f"📈 Current prediction count: {db.prediction_logs.count_documents({})}")
+        print(f"📊 Current user count: {db.users.estimated_document_count()}")
+        print(f"📈 Current prediction count: {db.prediction_logs.estimated_document_count()}")
         
         return True
         
@@ -170,7 +178,7 @@ def create_sample_predictions():
                     'predicted_disease': 'Common Cold',
                     'confidence': 0.95,
                     'success': True,
-                    'timestamp': datetime.utcnow(),
+                    'timestamp': utcnow(),
                     'metadata': {'source': 'demo_data'}
                 },
                 {
@@ -179,7 +187,7 @@ def create_sample_predictions():
                     'predicted_disease': 'Bronchial Asthma',
                     'confidence': 0.88,
                     'success': True,
-                    'timestamp': datetime.utcnow(),
+                    'timestamp': utcnow(),
                     'metadata': {'source': 'demo_data'}
                 },
                 {
@@ -188,7 +196,7 @@ def create_sample_predictions():
                     'predicted_disease': 'Gastroenteritis',
                     'confidence': 0.92,
                     'success': True,
-                    'timestamp': datetime.utcnow(),
+                    'timestamp': utcnow(),
                     'metadata': {'source': 'demo_data'}
                 }
             ]
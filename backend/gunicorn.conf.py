@@ -0,0 +1,22 @@
+"""
+Gunicorn configuration for the Medicine Prediction System backend
+
+Usage: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '5000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', 2 * (os.cpu_count() or 1) + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Import the app once in the master; workers share its memory copy-on-write
+preload_app = True
+
+def when_ready(server):
+    """Load the ML model in the master before any workers are forked"""
+    from routes.ml import predictor
+    if predictor:
+        predictor.preload()
+        server.log.info("ML model preloaded")
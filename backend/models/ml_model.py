@@ -1,19 +1,124 @@
+import hashlib
 import pickle
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import os
+import threading
+from functools import lru_cache
+from types import MappingProxyType
+
+# Number of distinct symptom sets whose predictions are kept in memory
+PREDICTION_CACHE_SIZE = 4096
+
+# Prebuilt lookup maps (see build_lookup.py) and the files they are derived from
+LOOKUP_SNAPSHOT = 'lookup.pkl'
+LOOKUP_SOURCES = ['svc.pkl', 'Training.csv', 'description.csv', 'precautions_df.csv',
+                  'medications.csv', 'diets.csv', 'workout_df.csv']
+LOOKUP_ATTRS = ['desc_map', 'prec_map', 'med_map', 'diet_map', 'workout_map', 'pattern_map']
+
+# Symptoms dictionary from your notebook (symptom name -> feature column)
+_SYMPTOMS_DICT = MappingProxyType({
+    'itching': 0, 'skin_rash': 1, 'nodal_skin_eruptions': 2, 'continuous_sneezing': 3,
+    'shivering': 4, 'chills': 5, 'joint_pain': 6, 'stomach_pain': 7, 'acidity': 8,
+    'ulcers_on_tongue': 9, 'muscle_wasting': 10, 'vomiting': 11, 'burning_micturition': 12,
+    'spotting_ urination': 13, 'fatigue': 14, 'weight_gain': 15, 'anxiety': 16,
+    'cold_hands_and_feets': 17, 'mood_swings': 18, 'weight_loss': 19, 'restlessness': 20,
+    'lethargy': 21, 'patches_in_throat': 22, 'irregular_sugar_level': 23, 'cough': 24,
+    'high_fever': 25, 'sunken_eyes': 26, 'breathlessness': 27, 'sweating': 28,
+    'dehydration': 29, 'indigestion': 30, 'headache': 31, 'yellowish_skin': 32,
+    'dark_urine': 33, 'nausea': 34, 'loss_of_appetite': 35, 'pain_behind_the_eyes': 36,
+    'back_pain': 37, 'constipation': 38, 'abdominal_pain': 39, 'diarrhoea': 40,
+    'mild_fever': 41, 'yellow_urine': 42, 'yellowing_of_eyes': 43, 'acute_liver_failure': 44,
+    'fluid_overload': 45, 'swelling_of_stomach': 46, 'swelled_lymph_nodes': 47, 'malaise': 48,
+    'blurred_and_distorted_vision': 49, 'phlegm': 50, 'throat_irritation': 51,
+    'redness_of_eyes': 52, 'sinus_pressure': 53, 'runny_nose': 54, 'congestion': 55,
+    'chest_pain': 56, 'weakness_in_limbs': 57, 'fast_heart_rate': 58,
+    'pain_during_bowel_movements': 59, 'pain_in_anal_region': 60, 'bloody_stool': 61,
+    'irritation_in_anus': 62, 'neck_pain': 63, 'dizziness': 64, 'cramps': 65,
+    'bruising': 66, 'obesity': 67, 'swollen_legs': 68, 'swollen_blood_vessels': 69,
+    'puffy_face_and_eyes': 70, 'enlarged_thyroid': 71, 'brittle_nails': 72,
+    'swollen_extremeties': 73, 'excessive_hunger': 74, 'extra_marital_contacts': 75,
+    'drying_and_tingling_lips': 76, 'slurred_speech': 77, 'knee_pain': 78,
+    'hip_joint_pain': 79, 'muscle_weakness': 80, 'stiff_neck': 81, 'swelling_joints': 82,
+    'movement_stiffness': 83, 'spinning_movements': 84, 'loss_of_balance': 85,
+    'unsteadiness': 86, 'weakness_of_one_body_side': 87, 'loss_of_smell': 88,
+    'bladder_discomfort': 89, 'foul_smell_of urine': 90, 'continuous_feel_of_urine': 91,
+    'passage_of_gases': 92, 'internal_itching': 93, 'toxic_look_(typhos)': 94,
+    'depression': 95, 'irritability': 96, 'muscle_pain': 97, 'altered_sensorium': 98,
+    'red_spots_over_body': 99, 'belly_pain': 100, 'abnormal_menstruation': 101,
+    'dischromic _patches': 102, 'watering_from_eyes': 103, 'increased_appetite': 104,
+    'polyuria': 105, 'family_history': 106, 'mucoid_sputum': 107, 'rusty_sputum': 108,
+    'lack_of_concentration': 109, 'visual_disturbances': 110, 'receiving_blood_transfusion': 111,
+    'receiving_unsterile_injections': 112, 'coma': 113, 'stomach_bleeding': 114,
+    'distention_of_abdomen': 115, 'history_of_alcohol_consumption': 116, 'fluid_overload.1': 117,
+    'blood_in_sputum': 118, 'prominent_veins_on_calf': 119, 'palpitations': 120,
+    'painful_walking': 121, 'pus_filled_pimples': 122, 'blackheads': 123, 'scurring': 124,
+    'skin_peeling': 125, 'silver_like_dusting': 126, 'small_dents_in_nails': 127,
+    'inflammatory_nails': 128, 'blister': 129, 'red_sore_around_nose': 130, 'yellow_crust_ooze': 131
+})
+
+# Diseases list from your notebook (class id -> disease name)
+_DISEASES_LIST = MappingProxyType({
+    15: 'Fungal infection', 4: 'Allergy', 16: 'GERD', 9: 'Chronic cholestasis',
+    14: 'Drug Reaction', 33: 'Peptic ulcer diseae', 1: 'AIDS', 12: 'Diabetes ',
+    17: 'Gastroenteritis', 6: 'Bronchial Asthma', 23: 'Hypertension ', 30: 'Migraine',
+    7: 'Cervical spondylosis', 32: 'Paralysis (brain hemorrhage)', 28: 'Jaundice',
+    29: 'Malaria', 8: 'Chicken pox', 11: 'Dengue', 37: 'Typhoid', 40: 'hepatitis A',
+    19: 'Hepatitis B', 20: 'Hepatitis C', 21: 'Hepatitis D', 22: 'Hepatitis E',
+    3: 'Alcoholic hepatitis', 36: 'Tuberculosis', 10: 'Common Cold', 34: 'Pneumonia',
+    13: 'Dimorphic hemmorhoids(piles)', 18: 'Heart attack', 39: 'Varicose veins',
+    26: 'Hypothyroidism', 24: 'Hyperthyroidism', 25: 'Hypoglycemia', 31: 'Osteoarthristis',
+    5: 'Arthritis', 0: '(vertigo) Paroymsal  Positional Vertigo', 2: 'Acne',
+    38: 'Urinary tract infection', 35: 'Psoriasis', 27: 'Impetigo'
+})
+
+# Symptom names in feature order, plus lowercased copies for case-insensitive search
+_SYMPTOMS_KEYS_TUPLE = tuple(_SYMPTOMS_DICT)
+_SYMPTOMS_KEYS_LOWER = tuple(key.lower() for key in _SYMPTOMS_KEYS_TUPLE)
+
+def _build_bigram_index(keys):
+    """Map each two-character substring to the positions of the keys containing it"""
+    index = {}
+    for position, key in enumerate(keys):
+        for i in range(len(key) - 1):
+            index.setdefault(key[i:i + 2], set()).add(position)
+    return {bigram: frozenset(positions) for bigram, positions in index.items()}
+
+# Bigram -> symptom positions, to narrow substring searches
+_SYMPTOM_BIGRAMS = _build_bigram_index(_SYMPTOMS_KEYS_LOWER)
+
+# Class id -> disease name as a tuple, so predictions are plain index lookups
+_DISEASES_ARR = tuple(_DISEASES_LIST.get(class_id) for class_id in range(max(_DISEASES_LIST) + 1))
 
 class MedicinePredictor:
     def __init__(self):
         self.model = None
-        self.symptoms_dict = None
-        self.diseases_list = None
+        # Static label maps are shared, read-only module constants
+        self.symptoms_dict = _SYMPTOMS_DICT
+        self.diseases_list = _DISEASES_LIST
+        self.diseases_arr = _DISEASES_ARR
+        self._symptom_keys = _SYMPTOMS_KEYS_TUPLE
+        self._symptom_keys_lower = _SYMPTOMS_KEYS_LOWER
+        self._symptom_bigrams = _SYMPTOM_BIGRAMS
         self.supporting_data = {}
-        self.load_model_and_data()
+        # One reusable input row per worker thread
+        self._local = threading.local()
+        # Per-instance memo of symptom set -> (disease, disease info)
+        self._cached_prediction = lru_cache(maxsize=PREDICTION_CACHE_SIZE)(self._predict_with_info)
+        # The model and datasets are loaded on first use, see _ensure_loaded
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self.base_path = self._find_assets_dir()
+        
+        # Fail fast if the model is missing, without paying for loading it yet
+        model_path = self.base_path / 'svc.pkl'
+        if not model_path.exists():
+            raise FileNotFoundError(f"Model file not found at {model_path}")
     
-    def load_model_and_data(self):
-        """Load your trained model and supporting datasets"""
+    @staticmethod
+    def _find_assets_dir():
+        """Locate the directory holding the model and datasets"""
         # Get the path to ml_assets directory - first try backend/ml_assets
         base_path = Path(__file__).parent.parent / 'ml_assets'
         
@@ -25,6 +130,27 @@ class MedicinePredictor:
         if not base_path.exists():
             base_path = Path(__file__).parent.parent.parent
         
+        return base_path
+    
+    def _ensure_loaded(self):
+        """Load the model and datasets the first time they are needed"""
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self.load_model_and_data()
+    
+    def preload(self):
+        """Load the model and datasets now instead of on first use"""
+        self._ensure_loaded()
+        
+        # One throwaway prediction pulls in sklearn's lazily imported predict path, so
+        # the first real request doesn't pay for it (and forked workers inherit it)
+        self.model.predict(np.zeros((1, len(self.symptoms_dict)), dtype=np.float64))
+    
+    def load_model_and_data(self, use_snapshot=True):
+        """Load your trained model and supporting datasets"""
+        base_path = self.base_path
+        
         try:
             # Load trained SVC model
             model_path = base_path / 'svc.pkl'
@@ -34,15 +160,14 @@ class MedicinePredictor:
             with open(model_path, 'rb') as f:
                 self.model = pickle.load(f)
             
-            # Load supporting datasets
-            self.supporting_data['symptoms'] = pd.read_csv(base_path / 'symtoms_df.csv')
-            self.supporting_data['precautions'] = pd.read_csv(base_path / 'precautions_df.csv')
-            self.supporting_data['workout'] = pd.read_csv(base_path / 'workout_df.csv')
-            self.supporting_data['description'] = pd.read_csv(base_path / 'description.csv')
-            self.supporting_data['medications'] = pd.read_csv(base_path / 'medications.csv')
-            self.supporting_data['diets'] = pd.read_csv(base_path / 'diets.csv')
+            # Cached predictions belong to the previously loaded model
+            self._cached_prediction.cache_clear()
             
-            print("✓ All data files loaded successfully")
+            if use_snapshot and self._load_lookup_snapshot():
+                print(f"✓ Lookup data loaded from {LOOKUP_SNAPSHOT}")
+            else:
+                self._build_lookups_from_csv()
+                print("✓ All data files loaded successfully")
             
         except FileNotFoundError as e:
             print(f"Error loading files: {e}")
@@ -51,161 +176,270 @@ class MedicinePredictor:
             print(f"Error loading model or data: {e}")
             raise e
         
-        # Symptoms dictionary from your notebook
-        self.symptoms_dict = {
-            'itching': 0, 'skin_rash': 1, 'nodal_skin_eruptions': 2, 'continuous_sneezing': 3,
-            'shivering': 4, 'chills': 5, 'joint_pain': 6, 'stomach_pain': 7, 'acidity': 8,
-            'ulcers_on_tongue': 9, 'muscle_wasting': 10, 'vomiting': 11, 'burning_micturition': 12,
-            'spotting_ urination': 13, 'fatigue': 14, 'weight_gain': 15, 'anxiety': 16,
-            'cold_hands_and_feets': 17, 'mood_swings': 18, 'weight_loss': 19, 'restlessness': 20,
-            'lethargy': 21, 'patches_in_throat': 22, 'irregular_sugar_level': 23, 'cough': 24,
-            'high_fever': 25, 'sunken_eyes': 26, 'breathlessness': 27, 'sweating': 28,
-            'dehydration': 29, 'indigestion': 30, 'headache': 31, 'yellowish_skin': 32,
-            'dark_urine': 33, 'nausea': 34, 'loss_of_appetite': 35, 'pain_behind_the_eyes': 36,
-            'back_pain': 37, 'constipation': 38, 'abdominal_pain': 39, 'diarrhoea': 40,
-            'mild_fever': 41, 'yellow_urine': 42, 'yellowing_of_eyes': 43, 'acute_liver_failure': 44,
-            'fluid_overload': 45, 'swelling_of_stomach': 46, 'swelled_lymph_nodes': 47, 'malaise': 48,
-            'blurred_and_distorted_vision': 49, 'phlegm': 50, 'throat_irritation': 51,
-            'redness_of_eyes': 52, 'sinus_pressure': 53, 'runny_nose': 54, 'congestion': 55,
-            'chest_pain': 56, 'weakness_in_limbs': 57, 'fast_heart_rate': 58,
-            'pain_during_bowel_movements': 59, 'pain_in_anal_region': 60, 'bloody_stool': 61,
-            'irritation_in_anus': 62, 'neck_pain': 63, 'dizziness': 64, 'cramps': 65,
-            'bruising': 66, 'obesity': 67, 'swollen_legs': 68, 'swollen_blood_vessels': 69,
-            'puffy_face_and_eyes': 70, 'enlarged_thyroid': 71, 'brittle_nails': 72,
-            'swollen_extremeties': 73, 'excessive_hunger': 74, 'extra_marital_contacts': 75,
-            'drying_and_tingling_lips': 76, 'slurred_speech': 77, 'knee_pain': 78,
-            'hip_joint_pain': 79, 'muscle_weakness': 80, 'stiff_neck': 81, 'swelling_joints': 82,
-            'movement_stiffness': 83, 'spinning_movements': 84, 'loss_of_balance': 85,
-            'unsteadiness': 86, 'weakness_of_one_body_side': 87, 'loss_of_smell': 88,
-            'bladder_discomfort': 89, 'foul_smell_of urine': 90, 'continuous_feel_of_urine': 91,
-            'passage_of_gases': 92, 'internal_itching': 93, 'toxic_look_(typhos)': 94,
-            'depression': 95, 'irritability': 96, 'muscle_pain': 97, 'altered_sensorium': 98,
-            'red_spots_over_body': 99, 'belly_pain': 100, 'abnormal_menstruation': 101,
-            'dischromic _patches': 102, 'watering_from_eyes': 103, 'increased_appetite': 104,
-            'polyuria': 105, 'family_history': 106, 'mucoid_sputum': 107, 'rusty_sputum': 108,
-            'lack_of_concentration': 109, 'visual_disturbances': 110, 'receiving_blood_transfusion': 111,
-            'receiving_unsterile_injections': 112, 'coma': 113, 'stomach_bleeding': 114,
-            'distention_of_abdomen': 115, 'history_of_alcohol_consumption': 116, 'fluid_overload.1': 117,
-            'blood_in_sputum': 118, 'prominent_veins_on_calf': 119, 'palpitations': 120,
-            'painful_walking': 121, 'pus_filled_pimples': 122, 'blackheads': 123, 'scurring': 124,
-            'skin_peeling': 125, 'silver_like_dusting': 126, 'small_dents_in_nails': 127,
-            'inflammatory_nails': 128, 'blister': 129, 'red_sore_around_nose': 130, 'yellow_crust_ooze': 131
-        }
+        self._loaded = True
+    
+    def _build_lookups_from_csv(self):
+        """Build the lookup maps from the CSV datasets and the model"""
+        base_path = self.base_path
         
-        # Diseases list from your notebook  
-        self.diseases_list = {
-            15: 'Fungal infection', 4: 'Allergy', 16: 'GERD', 9: 'Chronic cholestasis',
-            14: 'Drug Reaction', 33: 'Peptic ulcer diseae', 1: 'AIDS', 12: 'Diabetes ',
-            17: 'Gastroenteritis', 6: 'Bronchial Asthma', 23: 'Hypertension ', 30: 'Migraine',
-            7: 'Cervical spondylosis', 32: 'Paralysis (brain hemorrhage)', 28: 'Jaundice',
-            29: 'Malaria', 8: 'Chicken pox', 11: 'Dengue', 37: 'Typhoid', 40: 'hepatitis A',
-            19: 'Hepatitis B', 20: 'Hepatitis C', 21: 'Hepatitis D', 22: 'Hepatitis E',
-            3: 'Alcoholic hepatitis', 36: 'Tuberculosis', 10: 'Common Cold', 34: 'Pneumonia',
-            13: 'Dimorphic hemmorhoids(piles)', 18: 'Heart attack', 39: 'Varicose veins',
-            26: 'Hypothyroidism', 24: 'Hyperthyroidism', 25: 'Hypoglycemia', 31: 'Osteoarthristis',
-            5: 'Arthritis', 0: '(vertigo) Paroymsal  Positional Vertigo', 2: 'Acne',
-            38: 'Urinary tract infection', 35: 'Psoriasis', 27: 'Impetigo'
-        }
+        # Load supporting datasets (only the columns used for lookups)
+        self.supporting_data['precautions'] = pd.read_csv(
+            base_path / 'precautions_df.csv',
+            usecols=['Disease', 'Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4']
+        )
+        self.supporting_data['workout'] = pd.read_csv(base_path / 'workout_df.csv', usecols=['disease', 'workout'])
+        self.supporting_data['description'] = pd.read_csv(base_path / 'description.csv', usecols=['Disease', 'Description'])
+        self.supporting_data['medications'] = pd.read_csv(base_path / 'medications.csv', usecols=['Disease', 'Medication'])
+        self.supporting_data['diets'] = pd.read_csv(base_path / 'diets.csv', usecols=['Disease', 'Diet'])
+        
+        # Index the static datasets by disease so lookups are plain dict hits
+        self.build_lookup_maps()
+        
+        # Precomputed answers for the symptom combinations seen in training
+        self.build_pattern_map(base_path)
+    
+    def _load_lookup_snapshot(self):
+        """Load the lookup maps from lookup.pkl, if it exists and is up to date"""
+        snapshot_path = self.base_path / LOOKUP_SNAPSHOT
+        if not snapshot_path.exists():
+            return False
+        
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.load(f)
+        
+        # Compared by content, since git checkouts don't preserve file mtimes
+        if snapshot.get('sources_digest') != self._lookup_sources_digest():
+            print(f"{LOOKUP_SNAPSHOT} was built from different source files, rebuilding lookups from CSV")
+            return False
+        
+        for attr in LOOKUP_ATTRS:
+            setattr(self, attr, snapshot[attr])
+        return True
+    
+    def _lookup_sources_digest(self):
+        """Hash of the contents of the files the lookup maps are built from"""
+        digest = hashlib.blake2b(digest_size=16)
+        for name in LOOKUP_SOURCES:
+            source_path = self.base_path / name
+            digest.update(name.encode() + b'\0')
+            digest.update(source_path.read_bytes() if source_path.exists() else b'missing')
+            digest.update(b'\0')
+        return digest.hexdigest()
+    
+    def save_lookup_snapshot(self, path=None):
+        """Write the current lookup maps to lookup.pkl"""
+        self._ensure_loaded()
+        snapshot_path = path or self.base_path / LOOKUP_SNAPSHOT
+        snapshot = {attr: getattr(self, attr) for attr in LOOKUP_ATTRS}
+        snapshot['sources_digest'] = self._lookup_sources_digest()
+        
+        with open(snapshot_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return snapshot_path
     
     def predict_disease(self, patient_symptoms):
         """Predict disease from symptoms using your existing function"""
-        input_vector = np.zeros(len(self.symptoms_dict))
+        self._ensure_loaded()
         
-        for item in patient_symptoms:
-            if item in self.symptoms_dict:
-                input_vector[self.symptoms_dict[item]] = 1
+        # Known symptom combinations skip the SVC entirely
+        symptom_set = frozenset(item for item in patient_symptoms if item in self.symptoms_dict)
+        disease = self.pattern_map.get(symptom_set)
+        if disease is not None:
+            return disease
         
-        prediction = self.model.predict([input_vector])[0]
-        return self.diseases_list[prediction]
+        # Reuse the already filtered set, so the input is only scanned once
+        input_buf = self._get_input_buffer()
+        input_buf.fill(0)
+        input_buf[0, [self.symptoms_dict[item] for item in symptom_set]] = 1
+        
+        prediction = self.model.predict(input_buf)[0]
+        return self.diseases_arr[int(prediction)]
     
-    def get_disease_info(self, disease):
-        """Get disease information from supporting data"""
+    def predict_batch(self, list_of_symptoms):
+        """Predict diseases for several symptom lists with a single model call"""
+        self._ensure_loaded()
+        
+        predictions = [None] * len(list_of_symptoms)
+        pending = []
+        for i, symptoms in enumerate(list_of_symptoms):
+            symptom_set = frozenset(item for item in symptoms if item in self.symptoms_dict)
+            if not symptom_set:
+                continue
+            disease = self.pattern_map.get(symptom_set)
+            if disease is None:
+                pending.append((i, symptom_set))
+            else:
+                predictions[i] = disease
+        
+        if pending:
+            X = np.zeros((len(pending), len(self.symptoms_dict)), dtype=np.float64)
+            for row, (_, symptom_set) in enumerate(pending):
+                X[row, [self.symptoms_dict[item] for item in symptom_set]] = 1
+            
+            for (i, _), prediction in zip(pending, self.model.predict(X)):
+                predictions[i] = self.diseases_arr[int(prediction)]
+        
+        return predictions
+    
+    def _get_input_buffer(self):
+        """Get this thread's preallocated (1, n_features) input row"""
+        input_buf = getattr(self._local, 'input_buf', None)
+        if input_buf is None:
+            # float64 matches the dtype the SVC was trained with, so sklearn doesn't cast
+            input_buf = np.zeros((1, len(self.symptoms_dict)), dtype=np.float64)
+            self._local.input_buf = input_buf
+        return input_buf
+    
+    def build_lookup_maps(self):
+        """Pre-index the supporting datasets by disease name"""
         description_df = self.supporting_data['description']
         precautions_df = self.supporting_data['precautions']
         medications_df = self.supporting_data['medications']
         diets_df = self.supporting_data['diets']
         workout_df = self.supporting_data['workout']
         
-        # Description
-        desc = description_df[description_df['Disease'] == disease]['Description']
-        desc = " ".join([str(w) for w in desc.values]) if len(desc) > 0 else "No description available"
-
-        # Precautions
-        pre = precautions_df[precautions_df['Disease'] == disease][
-            ['Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4']
-        ]
-        precautions_list = []
-        if len(pre) > 0:
-            for row in pre.values:
-                for item in row:
-                    if pd.notna(item) and str(item).strip():
-                        precautions_list.append(str(item))
-
-        # Medications
-        med = medications_df[medications_df['Disease'] == disease]['Medication']
-        med_list = [str(m) for m in med.values] if len(med) > 0 else []
-
-        # Diet
-        die = diets_df[diets_df['Disease'] == disease]['Diet']
-        diet_list = [str(d) for d in die.values] if len(die) > 0 else []
-
-        # Workout
-        wrkout = workout_df[workout_df['disease'] == disease]['workout']
-        wrkout_list = [str(w) for w in wrkout.values] if len(wrkout) > 0 else []
+        # Description (multiple rows for a disease are joined)
+        self.desc_map = description_df.groupby('Disease', sort=False)['Description'].agg(
+            lambda rows: " ".join(str(w) for w in rows)
+        ).to_dict()
+        
+        # Precautions, flattened row by row with missing cells dropped in one vectorized pass
+        self.prec_map = {}
+        precaution_cols = ['Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4']
+        values = precautions_df[precaution_cols].values.ravel()
+        diseases = np.repeat(precautions_df['Disease'].values, len(precaution_cols))
+        present = pd.notna(values)
+        for disease, item in zip(diseases[present], values[present]):
+            item = str(item)
+            if item.strip():
+                self.prec_map.setdefault(disease, []).append(item)
+        
+        # Medications, diet and workout
+        self.med_map = medications_df.groupby('Disease', sort=False)['Medication'].agg(
+            lambda rows: [str(m) for m in rows]
+        ).to_dict()
+        self.diet_map = diets_df.groupby('Disease', sort=False)['Diet'].agg(
+            lambda rows: [str(d) for d in rows]
+        ).to_dict()
+        self.workout_map = workout_df.groupby('disease', sort=False)['workout'].agg(
+            lambda rows: [str(w) for w in rows]
+        ).to_dict()
+        
+        # The DataFrames are no longer needed once indexed
+        self.supporting_data = {}
+    
+    def build_pattern_map(self, base_path):
+        """Map every distinct training symptom set to the model's prediction for it"""
+        self.pattern_map = {}
+        training_path = base_path / 'Training.csv'
+        if not training_path.exists():
+            print(f"Training data not found at {training_path}, skipping pattern map")
+            return
+        
+        training_df = pd.read_csv(training_path).drop(columns=['prognosis'])
+        training_df = training_df.drop_duplicates()
+        
+        # One batched SVC call so the map agrees with the model exactly
+        symptom_names = np.array(training_df.columns)
+        predictions = self.model.predict(training_df)
+        for row, prediction in zip(training_df.values, predictions):
+            symptom_set = frozenset(symptom_names[row == 1].tolist())
+            self.pattern_map[symptom_set] = self.diseases_arr[int(prediction)]
+    
+    def get_disease_info(self, disease):
+        """Get disease information from the pre-built lookup maps"""
+        self._ensure_loaded()
         
         return {
-            'description': desc,
-            'precautions': precautions_list,
-            'medications': med_list,
-            'diet': diet_list,
-            'workout': wrkout_list
+            'description': self.desc_map.get(disease, "No description available"),
+            'precautions': list(self.prec_map.get(disease, [])),
+            'medications': list(self.med_map.get(disease, [])),
+            'diet': list(self.diet_map.get(disease, [])),
+            'workout': list(self.workout_map.get(disease, []))
+        }
+    
+    def _predict_with_info(self, symptom_set):
+        """Predict disease and look up its details for a set of valid symptoms"""
+        predicted_disease = self.predict_disease(symptom_set)
+        return predicted_disease, self.get_disease_info(predicted_disease)
+    
+    def _clean_symptoms(self, symptoms):
+        """Split raw symptom input into valid and invalid symptom names"""
+        valid_symptoms, invalid_symptoms = [], []
+        symptoms_dict = self.symptoms_dict
+        
+        # Clean and classify in a single pass
+        for sym in symptoms:
+            sym = sym.strip()
+            if not sym:
+                continue
+            sym = sym.strip("[]' '")
+            (valid_symptoms if sym in symptoms_dict else invalid_symptoms).append(sym)
+        return valid_symptoms, invalid_symptoms
+    
+    def _build_result(self, predicted_disease, disease_info, valid_symptoms, invalid_symptoms):
+        """Assemble the prediction response for one symptom list"""
+        if not valid_symptoms:
+            return {
+                'success': False,
+                'error': 'No valid symptoms provided',
+                'invalid_symptoms': invalid_symptoms,
+                'message': 'Please provide valid symptoms from the available list'
+            }
+        
+        return {
+            'success': True,
+            'predicted_disease': predicted_disease,
+            'confidence': 1.0,  # Your model achieved 100% accuracy
+            'description': disease_info['description'],
+            'precautions': list(disease_info['precautions']),
+            'medications': list(disease_info['medications']),
+            'diet': list(disease_info['diet']),
+            'workout': list(disease_info['workout']),
+            'symptoms_detected': valid_symptoms,
+            'invalid_symptoms': invalid_symptoms,
+            'total_symptoms': len(valid_symptoms)
+        }
+    
+    def _build_error_result(self, error):
+        """The response for a symptom list whose prediction failed"""
+        return {
+            'success': False,
+            'error': str(error),
+            'message': 'Error in prediction process'
         }
     
     def get_prediction_with_details(self, symptoms):
         """Complete prediction with all details"""
         try:
-            # Clean symptoms input
-            user_symptoms = [s.strip() for s in symptoms if s.strip()]
-            user_symptoms = [sym.strip("[]' '") for sym in user_symptoms]
-            
-            # Validate symptoms
-            valid_symptoms = [sym for sym in user_symptoms if sym in self.symptoms_dict]
-            invalid_symptoms = [sym for sym in user_symptoms if sym not in self.symptoms_dict]
-            
+            valid_symptoms, invalid_symptoms = self._clean_symptoms(symptoms)
             if not valid_symptoms:
-                return {
-                    'success': False,
-                    'error': 'No valid symptoms provided',
-                    'invalid_symptoms': invalid_symptoms,
-                    'message': 'Please provide valid symptoms from the available list'
-                }
-            
-            # Predict disease
-            predicted_disease = self.predict_disease(valid_symptoms)
+                return self._build_result(None, None, valid_symptoms, invalid_symptoms)
             
-            # Get detailed information
-            disease_info = self.get_disease_info(predicted_disease)
-            
-            return {
-                'success': True,
-                'predicted_disease': predicted_disease,
-                'confidence': 1.0,  # Your model achieved 100% accuracy
-                'description': disease_info['description'],
-                'precautions': disease_info['precautions'],
-                'medications': disease_info['medications'],
-                'diet': disease_info['diet'],
-                'workout': disease_info['workout'],
-                'symptoms_detected': valid_symptoms,
-                'invalid_symptoms': invalid_symptoms,
-                'total_symptoms': len(valid_symptoms)
-            }
+            # Predict disease and get detailed information (memoized per symptom set)
+            predicted_disease, disease_info = self._cached_prediction(frozenset(valid_symptoms))
+            return self._build_result(predicted_disease, disease_info, valid_symptoms, invalid_symptoms)
         
         except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'message': 'Error in prediction process'
-            }
+            return self._build_error_result(e)
+    
+    def get_batch_predictions_with_details(self, list_of_symptoms):
+        """Complete predictions with all details for several symptom lists"""
+        try:
+            cleaned = [self._clean_symptoms(symptoms) for symptoms in list_of_symptoms]
+            predictions = self.predict_batch([valid for valid, _ in cleaned])
+        except Exception:
+            # Predict one entry at a time instead, so a bad entry only fails its own result
+            return [self.get_prediction_with_details(symptoms) for symptoms in list_of_symptoms]
+        
+        results = []
+        for (valid_symptoms, invalid_symptoms), predicted_disease in zip(cleaned, predictions):
+            try:
+                disease_info = self.get_disease_info(predicted_disease) if predicted_disease else None
+                results.append(self._build_result(predicted_disease, disease_info, valid_symptoms, invalid_symptoms))
+            except Exception as e:
+                results.append(self._build_error_result(e))
+        return results
     
     def get_all_symptoms(self):
         """Get list of all available symptoms"""
@@ -218,8 +452,18 @@ class MedicinePredictor:
     def search_symptoms(self, query, limit=10):
         """Search symptoms by partial name match"""
         query = query.lower()
+        if len(query) < 2:
+            candidates = range(len(self._symptom_keys))
+        else:
+            # A symptom can only contain the query if it contains every bigram of it
+            postings = sorted(
+                (self._symptom_bigrams.get(query[i:i + 2], frozenset()) for i in range(len(query) - 1)),
+                key=len
+            )
+            candidates = sorted(postings[0].intersection(*postings[1:]))
+        
         matching_symptoms = [
-            symptom for symptom in self.symptoms_dict.keys() 
-            if query in symptom.lower()
+            self._symptom_keys[i] for i in candidates
+            if query in self._symptom_keys_lower[i]
         ]
         return matching_symptoms[:limit]
@@ -1,23 +1,79 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from utils.db_config import get_db, get_user_by_id, get_system_stats
-from datetime import datetime, timedelta
+from flask import Blueprint, Response, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from utils.db_config import get_db, get_user_by_id, get_system_stats, facet_count, CASE_INSENSITIVE
+from utils.cache import TTLCache
+from utils.json_provider import dumps_documents
+from utils.dates import utcnow
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 from bson import ObjectId
 import logging
 
 admin_bp = Blueprint('admin', __name__)
 
+# Serialized dashboard/analytics bodies; admin UIs poll these and tolerate brief staleness
+RESPONSE_CACHE_TTL = 2
+_response_cache = TTLCache(maxsize=16, ttl=RESPONSE_CACHE_TTL)
+
+# Server-side time limit for admin reads, so a slow aggregation can't pin a worker thread
+QUERY_TIMEOUT_MS = 5000
+
+# Upper bound on user ids accepted by /users/batch-status
+MAX_BATCH_USERS = 1000
+
+# User id -> role for admin checks; a demoted admin loses access within this many seconds
+ROLE_CACHE_TTL = 30
+_role_cache = TTLCache(maxsize=1024, ttl=ROLE_CACHE_TTL)
+
+# Runs independent MongoDB queries in parallel (pymongo releases the GIL on socket I/O)
+_query_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='admin-query')
+
 def check_admin_access(user_id):
     """Check if user has admin access"""
-    user = get_user_by_id(user_id)
-    if not user:
-        return False, 'User not found'
+    # Tokens carry the role claim, so non-admin tokens are rejected without a lookup
+    claimed_role = get_jwt().get('role')
+    if claimed_role is not None and claimed_role != 'admin':
+        return False, 'Access denied: Admin privileges required'
+    
+    # Admin claims are confirmed against the database, cached briefly so demotions still apply
+    role = _role_cache.get(user_id)
+    if role is None:
+        user = get_user_by_id(user_id)
+        if not user:
+            return False, 'User not found'
+        role = user.get('role', '')
+        _role_cache.set(user_id, role)
     
-    if user.get('role') != 'admin':
+    if role != 'admin':
         return False, 'Access denied: Admin privileges required'
     
     return True, None
 
+def _cached_response(key):
+    """Get a cached JSON response body as a fresh Response, or None"""
+    body = _response_cache.get(key)
+    if body is None:
+        return None
+    return Response(body, mimetype='application/json')
+
+def _documents_response(payload):
+    """JSON response for payloads holding raw MongoDB documents"""
+    return Response(dumps_documents(payload), mimetype='application/json')
+
+def _cache_response(key, payload):
+    """Serialize a payload once, cache the bytes and return the Response"""
+    body = dumps_documents(payload)
+    _response_cache.set(key, body)
+    return Response(body, mimetype='application/json')
+
+def parse_oid(value):
+    """Parse a user-supplied id into an ObjectId, or None if it isn't one"""
+    return ObjectId(value) if isinstance(value, str) and ObjectId.is_valid(value) else None
+
+def _aggregate_one(collection, pipeline, **kwargs):
+    """Run a pipeline that yields a single document (e.g. a $facet) and return it"""
+    return next(collection.aggregate(pipeline, maxTimeMS=QUERY_TIMEOUT_MS, **kwargs))
+
 @admin_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 def get_admin_dashboard():
@@ -33,6 +89,10 @@ def get_admin_dashboard():
                 'message': error_msg
             }), 403
         
+        cached = _cached_response('dashboard')
+        if cached is not None:
+            return cached
+        
         db = get_db()
         if db is None:
             return jsonify({
@@ -40,96 +100,97 @@ def get_admin_dashboard():
                 'message': 'Database connection failed'
             }), 500
         
-        # Get system statistics
-        stats = get_system_stats()
-        
-        # Get recent user registrations
-        recent_users = list(db.users.find(
-            {}, 
-            {'first_name': 1, 'last_name': 1, 'email': 1, 'role': 1, 'created_at': 1, 'last_login': 1}
-        ).sort('created_at', -1).limit(10))
-        
-        # Format recent users
-        formatted_users = []
-        for user in recent_users:
-            user['_id'] = str(user['_id'])
-            if 'created_at' in user and user['created_at']:
-                user['created_at'] = user['created_at'].isoformat()
-            if 'last_login' in user and user['last_login']:
-                user['last_login'] = user['last_login'].isoformat()
-            formatted_users.append(user)
-        
-        # Get recent predictions (system-wide)
-        recent_predictions = list(db.prediction_logs.find(
-            {},
-            {'user_id': 1, 'predicted_disease': 1, 'confidence': 1, 'timestamp': 1, 'success': 1}
-        ).sort('timestamp', -1).limit(15))
-        
-        # Format predictions
-        formatted_predictions = []
-        for pred in recent_predictions:
-            pred['_id'] = str(pred['_id'])
-            if 'timestamp' in pred and pred['timestamp']:
-                pred['timestamp'] = pred['timestamp'].isoformat()
-            formatted_predictions.append(pred)
-        
-        # Calculate additional metrics
-        now = datetime.utcnow()
+        # Time filters compare the raw timestamp/created_at fields against these precomputed
+        # datetimes, so the bounding $match stages below can use the indexes on those fields
+        # BSON dates have millisecond precision; truncate so $bucket ids match the boundaries
+        now = utcnow()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
         today = now.replace(hour=0, minute=0, second=0, microsecond=0)
         week_ago = now - timedelta(days=7)
         month_ago = now - timedelta(days=30)
-        
-        # Users registered this week/month
-        users_this_week = db.users.count_documents({'created_at': {'$gte': week_ago}})
-        users_this_month = db.users.count_documents({'created_at': {'$gte': month_ago}})
-        
-        # Predictions this week/month
-        predictions_this_week = db.prediction_logs.count_documents({'timestamp': {'$gte': week_ago}})
-        predictions_this_month = db.prediction_logs.count_documents({'timestamp': {'$gte': month_ago}})
-        
-        # User role distribution
-        role_stats = list(db.users.aggregate([
-            {'$group': {'_id': '$role', 'count': {'$sum': 1}}}
-        ]))
-        
-        # Success rate (predictions with success=True)
-        total_predictions = db.prediction_logs.count_documents({})
-        successful_predictions = db.prediction_logs.count_documents({'success': True})
+        week_boundaries = [now - timedelta(weeks=i) for i in range(4, -1, -1)]
+        # Every windowed metric falls inside the last month (the trend covers 28 days)
+        window_start = min(month_ago, week_boundaries[0])
+        
+        # $facet sub-pipelines never use indexes, so each facet below is preceded by a $match on
+        # the indexed date field that bounds it to the last month; the unbounded metrics are
+        # separate index-backed queries. All of them run concurrently.
+        recent_users_future = _query_executor.submit(lambda: list(db.users.find(
+            {},
+            {'first_name': 1, 'last_name': 1, 'email': 1, 'role': 1, 'created_at': 1, 'last_login': 1}
+        ).sort('created_at', -1).limit(10).max_time_ms(QUERY_TIMEOUT_MS)))
+        user_window_future = _query_executor.submit(_aggregate_one, db.users, [
+            {'$match': {'created_at': {'$gte': window_start}}},
+            {'$facet': {
+                'week': [{'$match': {'created_at': {'$gte': week_ago}}}, {'$count': 'count'}],
+                'month': [{'$match': {'created_at': {'$gte': month_ago}}}, {'$count': 'count'}]
+            }}
+        ])
+        # Reads every user document, as the grouping always has
+        role_distribution_future = _query_executor.submit(lambda: list(db.users.aggregate(
+            [{'$group': {'_id': '$role', 'count': {'$sum': 1}}}], maxTimeMS=QUERY_TIMEOUT_MS
+        )))
+        recent_predictions_future = _query_executor.submit(lambda: list(db.prediction_logs.find(
+            {},
+            {'user_id': 1, 'predicted_disease': 1, 'confidence': 1, 'timestamp': 1, 'success': 1}
+        ).sort('timestamp', -1).limit(15).max_time_ms(QUERY_TIMEOUT_MS)))
+        prediction_facets = _aggregate_one(db.prediction_logs, [
+            {'$match': {'timestamp': {'$gte': window_start}}},
+            {'$facet': {
+                'today': [{'$match': {'timestamp': {'$gte': today}}}, {'$count': 'count'}],
+                'week': [{'$match': {'timestamp': {'$gte': week_ago}}}, {'$count': 'count'}],
+                'month': [{'$match': {'timestamp': {'$gte': month_ago}}}, {'$count': 'count'}],
+                'weekly_trend': [
+                    {'$match': {'timestamp': {'$gte': week_boundaries[0], '$lt': now}}},
+                    {'$bucket': {
+                        'groupBy': '$timestamp',
+                        'boundaries': week_boundaries,
+                        'output': {'count': {'$sum': 1}}
+                    }}
+                ]
+            }}
+        ])
+        user_window = user_window_future.result()
+        # Totals, active users and the success count come from the background-refreshed system stats
+        system_stats = get_system_stats()
+        
+        # Success rate (predictions with success=True); both counts are from the same snapshot
+        total_predictions = system_stats.get('total_predictions', 0)
+        successful_predictions = system_stats.get('successful_predictions', 0)
         success_rate = (successful_predictions / total_predictions * 100) if total_predictions > 0 else 0
         
-        # Weekly prediction trend (last 4 weeks)
-        weekly_trend = []
-        for i in range(4):
-            week_start = now - timedelta(weeks=i+1)
-            week_end = now - timedelta(weeks=i)
-            count = db.prediction_logs.count_documents({
-                'timestamp': {'$gte': week_start, '$lt': week_end}
-            })
-            weekly_trend.append({
-                'week': f'Week {4-i}',
-                'count': count,
-                'start_date': week_start.isoformat(),
-                'end_date': week_end.isoformat()
-            })
+        # Weekly prediction trend (last 4 weeks, newest first); empty weeks have no bucket
+        bucket_counts = {bucket['_id']: bucket['count'] for bucket in prediction_facets['weekly_trend']}
+        weekly_trend = [
+            {
+                'week': f'Week {week}',
+                'count': bucket_counts.get(week_boundaries[week - 1], 0),
+                'start_date': week_boundaries[week - 1].isoformat(),
+                'end_date': week_boundaries[week].isoformat()
+            }
+            for week in range(4, 0, -1)
+        ]
         
-        return jsonify({
+        return _cache_response('dashboard', {
             'success': True,
             'system_stats': {
-                'total_users': stats.get('total_users', 0),
-                'total_predictions': stats.get('total_predictions', 0),
-                'predictions_today': stats.get('predictions_today', 0),
-                'active_users': stats.get('active_users', 0),
-                'users_this_week': users_this_week,
-                'users_this_month': users_this_month,
-                'predictions_this_week': predictions_this_week,
-                'predictions_this_month': predictions_this_month,
+                'total_users': system_stats.get('total_users', 0),
+                'total_predictions': total_predictions,
+                'predictions_today': facet_count(prediction_facets, 'today'),
+                'active_users': system_stats.get('active_users', 0),
+                'users_this_week': facet_count(user_window, 'week'),
+                'users_this_month': facet_count(user_window, 'month'),
+                'predictions_this_week': facet_count(prediction_facets, 'week'),
+                'predictions_this_month': facet_count(prediction_facets, 'month'),
                 'success_rate': round(success_rate, 2)
             },
-            'role_distribution': role_stats,
-            'common_diseases': stats.get('common_diseases', []),
-            'recent_users': formatted_users,
-            'recent_predictions': formatted_predictions,
-            'weekly_trend': weekly_trend
+            'role_distribution': role_distribution_future.result(),
+            # Group-by-disease over all predictions is kept off the request path
+            'common_diseases': system_stats.get('common_diseases', []),
+            'recent_users': recent_users_future.result(),
+            'recent_predictions': recent_predictions_future.result(),
+            'weekly_trend': weekly_trend,
+            'daily_trend': system_stats.get('daily_predictions', [])
         })
         
     except Exception as e:
@@ -173,35 +234,35 @@ def get_all_users():
             query['role'] = role_filter
         
         if search:
+            # Case-insensitive prefix match as an index range (U+FFFF sorts after every character)
+            prefix_range = {'$gte': search, '$lt': search + '\uffff'}
             query['$or'] = [
-                {'first_name': {'$regex': search, '$options': 'i'}},
-                {'last_name': {'$regex': search, '$options': 'i'}},
-                {'email': {'$regex': search, '$options': 'i'}}
+                {'first_name': prefix_range},
+                {'last_name': prefix_range},
+                {'email': prefix_range}
             ]
         
-        # Get total count
-        total_count = db.users.count_documents(query)
-        
-        # Get users with pagination
+        # Total count and the requested page in one round-trip; $match/$sort stay
+        # ahead of $facet so they can use the indexes
         skip = (page - 1) * limit
-        users = list(db.users.find(
-            query,
-            {'password_hash': 0}  # Exclude password hash
-        ).sort('created_at', -1).skip(skip).limit(limit))
-        
-        # Format users
-        formatted_users = []
-        for user in users:
-            user['_id'] = str(user['_id'])
-            if 'created_at' in user and user['created_at']:
-                user['created_at'] = user['created_at'].isoformat()
-            if 'last_login' in user and user['last_login']:
-                user['last_login'] = user['last_login'].isoformat()
-            formatted_users.append(user)
-        
-        return jsonify({
+        page_pipeline = [{'$skip': skip}] if skip > 0 else []
+        page_pipeline += [
+            {'$limit': limit},
+            {'$project': {'password_hash': 0}}  # Exclude password hash
+        ]
+        users_facets = _aggregate_one(db.users, [
+            {'$match': query},
+            {'$sort': {'created_at': -1}},
+            {'$facet': {
+                'total': [{'$count': 'count'}],
+                'page': page_pipeline
+            }}
+        ], collation=CASE_INSENSITIVE)
+        total_count = facet_count(users_facets, 'total')
+        
+        return _documents_response({
             'success': True,
-            'users': formatted_users,
+            'users': users_facets['page'],
             'pagination': {
                 'page': page,
                 'limit': limit,
@@ -232,6 +293,13 @@ def get_user_details(user_id):
                 'message': error_msg
             }), 403
         
+        user_oid = parse_oid(user_id)
+        if user_oid is None:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid user ID'
+            }), 400
+        
         db = get_db()
         if db is None:
             return jsonify({
@@ -241,7 +309,7 @@ def get_user_details(user_id):
         
         # Get user
         user = db.users.find_one(
-            {'_id': ObjectId(user_id)},
+            {'_id': user_oid},
             {'password_hash': 0}  # Exclude password hash
         )
         
@@ -251,34 +319,36 @@ def get_user_details(user_id):
                 'message': 'User not found'
             }), 404
         
-        # Get user's prediction history
-        predictions = list(db.prediction_logs.find(
-            {'user_id': user_id}
-        ).sort('timestamp', -1).limit(20))
-        
-        # Format data
-        user['_id'] = str(user['_id'])
-        if 'created_at' in user and user['created_at']:
-            user['created_at'] = user['created_at'].isoformat()
-        if 'last_login' in user and user['last_login']:
-            user['last_login'] = user['last_login'].isoformat()
-        
-        formatted_predictions = []
-        for pred in predictions:
-            pred['_id'] = str(pred['_id'])
-            if 'timestamp' in pred and pred['timestamp']:
-                pred['timestamp'] = pred['timestamp'].isoformat()
-            formatted_predictions.append(pred)
-        
-        # Calculate user stats
-        total_predictions = len(predictions)
-        successful_predictions = len([p for p in predictions if p.get('success')])
+        # Recent predictions and full-history stats in one round-trip
+        prediction_facets = _aggregate_one(db.prediction_logs, [
+            {'$match': {'user_id': user_id}},
+            {'$facet': {
+                'recent': [
+                    {'$sort': {'timestamp': -1}},
+                    {'$limit': 20},
+                    {'$project': {'symptoms': 1, 'predicted_disease': 1, 'confidence': 1,
+                                  'timestamp': 1, 'success': 1}}
+                ],
+                'stats': [
+                    {'$group': {
+                        '_id': None,
+                        'total': {'$sum': 1},
+                        'successful': {'$sum': {'$cond': [{'$eq': ['$success', True]}, 1, 0]}}
+                    }}
+                ]
+            }}
+        ])
+        
+        # Calculate user stats over the whole history, not just the recent page
+        stats = prediction_facets['stats'][0] if prediction_facets['stats'] else {}
+        total_predictions = stats.get('total', 0)
+        successful_predictions = stats.get('successful', 0)
         success_rate = (successful_predictions / total_predictions * 100) if total_predictions > 0 else 0
         
-        return jsonify({
+        return _documents_response({
             'success': True,
             'user': user,
-            'predictions': formatted_predictions,
+            'predictions': prediction_facets['recent'],
             'stats': {
                 'total_predictions': total_predictions,
                 'successful_predictions': successful_predictions,
@@ -296,7 +366,7 @@ def get_user_details(user_id):
 @admin_bp.route('/users/<user_id>/toggle-status', methods=['PUT'])
 @jwt_required()
 def toggle_user_status(user_id):
-    """Toggle user active/inactive status"""
+    """Toggle user active/inactive status (see /users/batch-status for several users)"""
     try:
         admin_user_id = get_jwt_identity()
         
@@ -315,6 +385,13 @@ def toggle_user_status(user_id):
                 'message': 'Cannot modify your own account status'
             }), 400
         
+        user_oid = parse_oid(user_id)
+        if user_oid is None:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid user ID'
+            }), 400
+        
         db = get_db()
         if db is None:
             return jsonify({
@@ -323,7 +400,7 @@ def toggle_user_status(user_id):
             }), 500
         
         # Get current status
-        user = db.users.find_one({'_id': ObjectId(user_id)})
+        user = db.users.find_one({'_id': user_oid})
         if not user:
             return jsonify({
                 'success': False,
@@ -334,7 +411,7 @@ def toggle_user_status(user_id):
         new_status = not user.get('is_active', True)
         
         result = db.users.update_one(
-            {'_id': ObjectId(user_id)},
+            {'_id': user_oid},
             {'$set': {'is_active': new_status}}
         )
         
@@ -358,6 +435,93 @@ def toggle_user_status(user_id):
             'message': f'Failed to toggle user status: {str(e)}'
         }), 500
 
+@admin_bp.route('/users/batch-status', methods=['PUT'])
+@jwt_required()
+def batch_update_user_status():
+    """Set active/inactive status for several users in one update (preferred over per-user toggles)"""
+    try:
+        admin_user_id = get_jwt_identity()
+        
+        # Check admin access
+        has_access, error_msg = check_admin_access(admin_user_id)
+        if not has_access:
+            return jsonify({
+                'success': False,
+                'message': error_msg
+            }), 403
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                'success': False,
+                'message': 'No data provided'
+            }), 400
+        
+        user_ids = data.get('user_ids', [])
+        is_active = data.get('is_active')
+        
+        if not user_ids or not isinstance(user_ids, list):
+            return jsonify({
+                'success': False,
+                'message': 'user_ids is required and must be an array'
+            }), 400
+        
+        if len(user_ids) > MAX_BATCH_USERS:
+            return jsonify({
+                'success': False,
+                'message': f'At most {MAX_BATCH_USERS} users can be updated at once'
+            }), 400
+        
+        if not isinstance(is_active, bool):
+            return jsonify({
+                'success': False,
+                'message': 'is_active is required and must be a boolean'
+            }), 400
+        
+        # Prevent admin from disabling themselves
+        if admin_user_id in user_ids:
+            return jsonify({
+                'success': False,
+                'message': 'Cannot modify your own account status'
+            }), 400
+        
+        user_oids = [parse_oid(uid) for uid in user_ids]
+        invalid_ids = [uid for uid, oid in zip(user_ids, user_oids) if oid is None]
+        if invalid_ids:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid user IDs',
+                'invalid_ids': invalid_ids
+            }), 400
+        
+        db = get_db()
+        if db is None:
+            return jsonify({
+                'success': False,
+                'message': 'Database connection failed'
+            }), 500
+        
+        result = db.users.update_many(
+            {'_id': {'$in': user_oids}},
+            {'$set': {'is_active': is_active}}
+        )
+        
+        status_text = 'activated' if is_active else 'deactivated'
+        return jsonify({
+            'success': True,
+            'message': f'{result.modified_count} user(s) {status_text} successfully',
+            'is_active': is_active,
+            'matched': result.matched_count,
+            'modified': result.modified_count
+        })
+        
+    except Exception as e:
+        logging.error(f"Admin batch user status error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Failed to update user status: {str(e)}'
+        }), 500
+
 @admin_bp.route('/analytics/predictions', methods=['GET'])
 @jwt_required()
 def get_prediction_analytics():
@@ -373,6 +537,13 @@ def get_prediction_analytics():
                 'message': error_msg
             }), 403
         
+        # Get time range from query parameters
+        days = int(request.args.get('days', 30))  # Default last 30 days
+        
+        cached = _cached_response(('analytics', days))
+        if cached is not None:
+            return cached
+        
         db = get_db()
         if db is None:
             return jsonify({
@@ -380,20 +551,16 @@ def get_prediction_analytics():
                 'message': 'Database connection failed'
             }), 500
         
-        # Get time range from query parameters
-        days = int(request.args.get('days', 30))  # Default last 30 days
-        start_date = datetime.utcnow() - timedelta(days=days)
+        now = utcnow()
+        start_date = now - timedelta(days=days)
         
         # Daily prediction counts
         daily_pipeline = [
             {'$match': {'timestamp': {'$gte': start_date}}},
             {
                 '$group': {
-                    '_id': {
-                        'year': {'$year': '$timestamp'},
-                        'month': {'$month': '$timestamp'},
-                        'day': {'$dayOfMonth': '$timestamp'}
-                    },
+                    # Midnight (UTC) of each day; requires MongoDB 5.0+
+                    '_id': {'$dateTrunc': {'date': '$timestamp', 'unit': 'day'}},
                     'count': {'$sum': 1},
                     'successful': {
                         '$sum': {
@@ -402,50 +569,43 @@ def get_prediction_analytics():
                     }
                 }
             },
-            {'$sort': {'_id.year': 1, '_id.month': 1, '_id.day': 1}}
+            {'$sort': {'_id': 1}}
         ]
         
-        daily_stats = list(db.prediction_logs.aggregate(daily_pipeline))
+        daily_stats = list(db.prediction_logs.aggregate(daily_pipeline, maxTimeMS=QUERY_TIMEOUT_MS))
         
-        # Disease frequency
-        disease_pipeline = [
+        # Per-disease stats grouped once, then sorted two ways for frequency and confidence
+        disease_facets = _aggregate_one(db.prediction_logs, [
             {'$match': {'timestamp': {'$gte': start_date}, 'success': True}},
             {
                 '$group': {
                     '_id': '$predicted_disease',
                     'count': {'$sum': 1},
-                    'avg_confidence': {'$avg': '$confidence'}
-                }
-            },
-            {'$sort': {'count': -1}},
-            {'$limit': 15}
-        ]
-        
-        disease_stats = list(db.prediction_logs.aggregate(disease_pipeline))
-        
-        # Average confidence by disease
-        confidence_pipeline = [
-            {'$match': {'timestamp': {'$gte': start_date}, 'success': True}},
-            {
-                '$group': {
-                    '_id': '$predicted_disease',
                     'avg_confidence': {'$avg': '$confidence'},
                     'min_confidence': {'$min': '$confidence'},
-                    'max_confidence': {'$max': '$confidence'},
-                    'count': {'$sum': 1}
+                    'max_confidence': {'$max': '$confidence'}
                 }
             },
-            {'$sort': {'avg_confidence': -1}}
-        ]
-        
-        confidence_stats = list(db.prediction_logs.aggregate(confidence_pipeline))
-        
-        return jsonify({
+            {'$facet': {
+                'frequency': [
+                    {'$sort': {'count': -1}},
+                    {'$limit': 15},
+                    {'$project': {'count': 1, 'avg_confidence': 1}}
+                ],
+                'confidence': [
+                    {'$sort': {'avg_confidence': -1}}
+                ]
+            }}
+        ])
+        disease_stats = disease_facets['frequency']
+        confidence_stats = disease_facets['confidence']
+        
+        return _cache_response(('analytics', days), {
             'success': True,
             'time_range': {
                 'days': days,
                 'start_date': start_date.isoformat(),
-                'end_date': datetime.utcnow().isoformat()
+                'end_date': now.isoformat()
             },
             'daily_predictions': daily_stats,
             'disease_frequency': disease_stats,
@@ -1,29 +1,85 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-from utils.db_config import create_user, get_user_by_email, get_user_by_id, update_user_login, get_db
-from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from utils.db_config import create_user, get_user_by_email, get_user_by_id, update_user_login, get_db, CASE_INSENSITIVE
+from utils.passwords import hash_password, verify_password
+from utils.cache import TTLCache
+from utils.dates import utcnow
+from pymongo import ReturnDocument
+from datetime import timedelta
 from bson import ObjectId
+from bson.errors import InvalidId
 import re
+import string
 import secrets
 import hashlib
 
 auth_bp = Blueprint('auth', __name__)
 
+# Validation patterns, compiled once
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+# Password character classes (ASCII only, like the original [A-Za-z] / [0-9] checks)
+_PW_LETTERS = frozenset(string.ascii_letters)
+_PW_DIGITS = frozenset(string.digits)
+
+# Checked against on unknown emails so they cost as much as a wrong password
+_DUMMY_HASH = hash_password(secrets.token_urlsafe(16))
+
+# Recently read user documents, keyed by user ID
+USER_CACHE_TTL = 30
+_user_cache = TTLCache(maxsize=50000, ttl=USER_CACHE_TTL)
+# User fields carried in the access token, so /validate-token needs no lookup
+TOKEN_USER_FIELDS = ('email', 'first_name', 'last_name', 'role')
+# Fields login reads: the credentials plus what goes into the token
+LOGIN_PROJECTION = dict.fromkeys(('password_hash', 'is_active', 'created_at') + TOKEN_USER_FIELDS, 1)
+# Fields left out of user documents returned by profile updates
+PROFILE_PROJECTION = {'password_hash': 0, 'reset_token': 0, 'reset_token_expires': 0}
+
+def user_claims(user):
+    """Additional JWT claims for a user"""
+    claims = {field: user[field] for field in TOKEN_USER_FIELDS}
+    # Lets the patient views skip the user lookup; truncated to the millisecond precision MongoDB stores
+    created_at = user.get('created_at')
+    if created_at:
+        created_at = created_at.replace(microsecond=created_at.microsecond // 1000 * 1000).isoformat()
+    claims['created_at'] = created_at
+    return claims
+
+def get_cached_user(user_id):
+    """Get a user by ID, served from the short-lived user cache when possible"""
+    user = _user_cache.get(user_id)
+    if user is None:
+        user = get_user_by_id(user_id)
+        if user:
+            _user_cache.set(user_id, user)
+    return user
+
+def hash_reset_token(reset_token):
+    """Hash a password reset token for storage and lookup"""
+    return hashlib.blake2b(reset_token.encode(), digest_size=32).hexdigest()
+
 def validate_email(email):
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 def validate_password(password):
     """Validate password strength"""
     if len(password) < 6:
         return False, "Password must be at least 6 characters long"
     
-    if not re.search(r'[A-Za-z]', password):
+    # Single pass over the password, stopping once both classes are seen
+    has_letter = has_digit = False
+    for char in password:
+        if char in _PW_LETTERS:
+            has_letter = True
+        elif char in _PW_DIGITS:
+            has_digit = True
+        if has_letter and has_digit:
+            break
+    
+    if not has_letter:
         return False, "Password must contain at least one letter"
     
-    if not re.search(r'[0-9]', password):
+    if not has_digit:
         return False, "Password must contain at least one number"
     
     return True, "Password is valid"
@@ -81,7 +137,7 @@ def register():
         # Create user data
         user_data = {
             'email': email,
-            'password_hash': generate_password_hash(password),
+            'password_hash': hash_password(password),
             'first_name': first_name,
             'last_name': last_name,
             'role': role,
@@ -103,6 +159,7 @@ def register():
         # Create access token
         access_token = create_access_token(
             identity=user_id,
+            additional_claims=user_claims(user_data),
             expires_delta=timedelta(days=7)
         )
         
@@ -148,8 +205,13 @@ def login():
             }), 400
         
         # Get user from database
-        user = get_user_by_email(email)
+        user = None
+        db = get_db()
+        if db is not None:
+            user = db.users.find_one({'email': email}, LOGIN_PROJECTION, collation=CASE_INSENSITIVE)
+        
         if not user:
+            verify_password(_DUMMY_HASH, password)
             return jsonify({
                 'success': False,
                 'message': 'Invalid email or password'
@@ -163,19 +225,22 @@ def login():
             }), 401
         
         # Verify password
-        if not check_password_hash(user['password_hash'], password):
+        password_matches, needs_rehash = verify_password(user['password_hash'], password)
+        if not password_matches:
             return jsonify({
                 'success': False,
                 'message': 'Invalid email or password'
             }), 401
         
-        # Update last login
+        # Update last login, migrating older hashes to the current argon2id parameters
         user_id = str(user['_id'])
-        update_user_login(user_id)
+        update_user_login(user_id, password_hash=hash_password(password) if needs_rehash else None)
+        _user_cache.pop(user_id)
         
         # Create access token
         access_token = create_access_token(
             identity=user_id,
+            additional_claims=user_claims(user),
             expires_delta=timedelta(days=7)
         )
         
@@ -205,7 +270,7 @@ def get_profile():
     """Get current user profile"""
     try:
         user_id = get_jwt_identity()
-        user = get_user_by_id(user_id)
+        user = get_cached_user(user_id)
         
         if not user:
             return jsonify({
@@ -251,14 +316,6 @@ def update_profile():
                 'message': 'No data provided'
             }), 400
         
-        # Get current user
-        user = get_user_by_id(user_id)
-        if not user:
-            return jsonify({
-                'success': False,
-                'message': 'User not found'
-            }), 404
-        
         # Update allowed fields
         allowed_fields = ['first_name', 'last_name']
         allowed_profile_fields = ['age', 'gender', 'phone']
@@ -283,39 +340,58 @@ def update_profile():
                 'message': 'No valid fields to update'
             }), 400
         
-        # Update user in database
-        from utils.db_config import get_db
-        from bson import ObjectId
+        # Update user in database, getting the updated document back in the same round trip
+        try:
+            user_oid = ObjectId(user_id)
+        except (InvalidId, TypeError):
+            return jsonify({
+                'success': False,
+                'message': 'User not found'
+            }), 404
         
         db = get_db()
-        if db:
-            result = db.users.update_one(
-                {'_id': ObjectId(user_id)},
-                {'$set': update_data}
-            )
-            
-            if result.modified_count > 0:
-                # Get updated user
-                updated_user = get_user_by_id(user_id)
-                user_data = {
-                    'id': str(updated_user['_id']),
-                    'email': updated_user['email'],
-                    'first_name': updated_user['first_name'],
-                    'last_name': updated_user['last_name'],
-                    'role': updated_user['role'],
-                    'profile': updated_user.get('profile', {})
-                }
-                
-                return jsonify({
-                    'success': True,
-                    'message': 'Profile updated successfully',
-                    'user': user_data
-                }), 200
+        if db is None:
+            return jsonify({
+                'success': False,
+                'message': 'Failed to update profile'
+            }), 500
+        
+        updated_user = db.users.find_one_and_update(
+            {'_id': user_oid},
+            {'$set': update_data},
+            projection=PROFILE_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        if not updated_user:
+            return jsonify({
+                'success': False,
+                'message': 'User not found'
+            }), 404
+        
+        _user_cache.pop(user_id)
+        
+        user_data = {
+            'id': str(updated_user['_id']),
+            'email': updated_user['email'],
+            'first_name': updated_user['first_name'],
+            'last_name': updated_user['last_name'],
+            'role': updated_user['role'],
+            'profile': updated_user.get('profile', {})
+        }
+        
+        # Fresh token, since the old one carries the previous name
+        access_token = create_access_token(
+            identity=user_id,
+            additional_claims=user_claims(updated_user),
+            expires_delta=timedelta(days=7)
+        )
         
         return jsonify({
-            'success': False,
-            'message': 'Failed to update profile'
-        }), 500
+            'success': True,
+            'message': 'Profile updated successfully',
+            'user': user_data,
+            'access_token': access_token
+        }), 200
         
     except Exception as e:
         return jsonify({
@@ -330,7 +406,13 @@ def validate_token():
     """Validate JWT token"""
     try:
         user_id = get_jwt_identity()
-        user = get_user_by_id(user_id)
+        claims = get_jwt()
+        
+        # Tokens carrying the user fields are valid on their own; older ones need a lookup
+        if all(field in claims for field in TOKEN_USER_FIELDS):
+            user = claims
+        else:
+            user = get_cached_user(user_id)
         
         if not user:
             return jsonify({
@@ -342,7 +424,7 @@ def validate_token():
             'success': True,
             'message': 'Token is valid',
             'user': {
-                'id': str(user['_id']),
+                'id': user_id,
                 'email': user['email'],
                 'first_name': user['first_name'],
                 'last_name': user['last_name'],
@@ -371,6 +453,7 @@ def demo_login():
             # Create demo access token
             access_token = create_access_token(
                 identity='demo_user_123',
+                additional_claims={'role': 'patient'},
                 expires_delta=timedelta(days=1)
             )
             
@@ -436,17 +519,17 @@ def forgot_password():
         
         # Generate reset token
         reset_token = secrets.token_urlsafe(32)
-        token_hash = hashlib.sha256(reset_token.encode()).hexdigest()
+        token_hash = hash_reset_token(reset_token)
         
         # Store reset token in database (expires in 1 hour)
         db = get_db()
-        if db:
+        if db is not None:
             db.users.update_one(
                 {'_id': user['_id']},
                 {
                     '$set': {
                         'reset_token': token_hash,
-                        'reset_token_expires': datetime.utcnow() + timedelta(hours=1)
+                        'reset_token_expires': utcnow() + timedelta(hours=1)
                     }
                 }
             )
@@ -495,15 +578,16 @@ def reset_password():
                 'message': message
             }), 400
         
-        # Hash the token to compare with stored hash
-        token_hash = hashlib.sha256(reset_token.encode()).hexdigest()
+        # Hash the token to compare with stored hash; SHA-256 hashes are still accepted
+        # for tokens issued before the switch to BLAKE2b (they expire within an hour)
+        token_hashes = [hash_reset_token(reset_token), hashlib.sha256(reset_token.encode()).hexdigest()]
         
         # Find user with matching token that hasn't expired
         db = get_db()
-        if db:
+        if db is not None:
             user = db.users.find_one({
-                'reset_token': token_hash,
-                'reset_token_expires': {'$gt': datetime.utcnow()}
+                'reset_token': {'$in': token_hashes},
+                'reset_token_expires': {'$gt': utcnow()}
             })
             
             if not user:
@@ -517,7 +601,7 @@ def reset_password():
                 {'_id': user['_id']},
                 {
                     '$set': {
-                        'password_hash': generate_password_hash(new_password)
+                        'password_hash': hash_password(new_password)
                     },
                     '$unset': {
                         'reset_token': '',
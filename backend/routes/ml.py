@@ -1,12 +1,22 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from models.ml_model import MedicinePredictor
 from utils.validators import validate_symptoms
+from utils.db_config import save_prediction_log
+from utils.compression import COMPRESS_MIN_SIZE, COMPRESS_LEVEL
 from datetime import datetime
+import gzip
+import hashlib
 import logging
+import orjson
+import time
 
 ml_bp = Blueprint('ml', __name__)
 
+MAX_BATCH_SIZE = 100
+# The symptom and disease lists only change when the model is redeployed
+STATIC_LIST_CACHE_CONTROL = 'public, max-age=3600'
+
 # Initialize predictor once when module loads
 try:
     predictor = MedicinePredictor()
@@ -15,6 +25,64 @@ except Exception as e:
     print(f"✗ Failed to initialize ML Predictor: {e}")
     predictor = None
 
+# (epoch second, ISO string) of the last formatted response timestamp
+_iso_cache = (None, None)
+
+def _iso_now():
+    """Current local time in ISO format, formatted at most once per second"""
+    global _iso_cache
+    second = int(time.time())
+    cached_second, iso = _iso_cache
+    if second != cached_second:
+        iso = datetime.fromtimestamp(second).isoformat()
+        _iso_cache = (second, iso)
+    return iso
+
+# Known symptom names by their lowercase form, for case-insensitive validation
+_symptom_lower = {symptom.lower(): symptom for symptom in predictor.symptoms_dict} if predictor else {}
+
+def _static_json(payload):
+    """Serialize a response body once, with its ETag and a gzipped copy if it's worth compressing"""
+    body = orjson.dumps(payload)
+    etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+    gzip_body = gzip.compress(body, compresslevel=COMPRESS_LEVEL) if len(body) >= COMPRESS_MIN_SIZE else None
+    return body, gzip_body, etag
+
+def _static_json_response(static_json):
+    """Serve a precomputed JSON body, or 304 if the client already has it"""
+    body, gzip_body, etag = static_json
+    
+    # Each encoding gets its own ETag, as the bodies differ
+    use_gzip = gzip_body is not None and 'gzip' in request.accept_encodings
+    if use_gzip:
+        body, etag = gzip_body, f'{etag}-gzip'
+    
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = STATIC_LIST_CACHE_CONTROL
+    return response
+
+# List responses are built once, since the model data is fixed for the process lifetime
+if predictor:
+    _symptoms = sorted(predictor.get_all_symptoms())
+    _SYMPTOMS_JSON = _static_json({
+        'success': True,
+        'symptoms': _symptoms,
+        'total_count': len(_symptoms)
+    })
+    _diseases = sorted(predictor.get_all_diseases())
+    _DISEASES_JSON = _static_json({
+        'success': True,
+        'diseases': _diseases,
+        'total_count': len(_diseases)
+    })
+
 @ml_bp.route('/predict', methods=['POST'])
 def predict_medicine():
     """Main prediction endpoint - works without authentication for demo purposes"""
@@ -37,23 +105,18 @@ def predict_medicine():
         symptoms = data.get('symptoms', [])
         
         # Validate input
-        if not symptoms or not isinstance(symptoms, list):
+        is_valid, message = validate_symptoms(symptoms)
+        if not is_valid:
             return jsonify({
                 'success': False,
-                'message': 'Symptoms list is required and must be an array'
-            }), 400
-        
-        if len(symptoms) == 0:
-            return jsonify({
-                'success': False,
-                'message': 'At least one symptom is required'
+                'message': message
             }), 400
         
         # Get prediction
         result = predictor.get_prediction_with_details(symptoms)
         
         # Add metadata
-        result['timestamp'] = datetime.now().isoformat()
+        result['timestamp'] = _iso_now()
         result['model_version'] = '1.0.0'
         
         # Log prediction to database
@@ -61,7 +124,6 @@ def predict_medicine():
         
         # Save to database if available (for anonymous predictions)
         try:
-            from utils.db_config import save_prediction_log
             if result.get('success'):
                 save_prediction_log(
                     user_id='anonymous',
@@ -82,6 +144,70 @@ def predict_medicine():
             'error': str(e)
         }), 500
 
+@ml_bp.route('/predict/batch', methods=['POST'])
+def predict_medicine_batch():
+    """Batch prediction endpoint - runs one model call for several symptom lists"""
+    if not predictor:
+        return jsonify({
+            'success': False,
+            'message': 'ML model not available',
+            'error': 'Predictor not initialized'
+        }), 500
+    
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'message': 'No data provided'
+            }), 400
+        
+        symptoms_batch = data.get('symptoms_batch', [])
+        
+        # Validate input
+        if not symptoms_batch or not isinstance(symptoms_batch, list):
+            return jsonify({
+                'success': False,
+                'message': 'symptoms_batch is required and must be an array of symptom arrays'
+            }), 400
+        
+        if len(symptoms_batch) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'message': f'A batch can contain at most {MAX_BATCH_SIZE} symptom lists'
+            }), 400
+        
+        for i, symptoms in enumerate(symptoms_batch):
+            is_valid, message = validate_symptoms(symptoms)
+            if not is_valid:
+                return jsonify({
+                    'success': False,
+                    'message': f'Batch entry {i}: {message}'
+                }), 400
+        
+        results = predictor.get_batch_predictions_with_details(symptoms_batch)
+        successful = sum(1 for result in results if result['success'])
+        
+        logging.info(f"Batch prediction made: {len(results)} items, {successful} successful")
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'count': len(results),
+            'successful': successful,
+            'timestamp': _iso_now(),
+            'model_version': '1.0.0'
+        }), 200
+        
+    except Exception as e:
+        logging.error(f"Batch prediction error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error during batch prediction',
+            'error': str(e)
+        }), 500
+
 @ml_bp.route('/predict-authenticated', methods=['POST'])
 @jwt_required()
 def predict_medicine_authenticated():
@@ -98,10 +224,11 @@ def predict_medicine_authenticated():
         symptoms = data.get('symptoms', [])
         
         # Validate input
-        if not symptoms or not isinstance(symptoms, list):
+        is_valid, message = validate_symptoms(symptoms)
+        if not is_valid:
             return jsonify({
                 'success': False,
-                'message': 'Symptoms list is required'
+                'message': message
             }), 400
         
         # Get prediction
@@ -109,11 +236,10 @@ def predict_medicine_authenticated():
         
         # Add user context
         result['user_id'] = user_id
-        result['timestamp'] = datetime.now().isoformat()
+        result['timestamp'] = _iso_now()
         
         # Save to database for history
         try:
-            from utils.db_config import save_prediction_log
             if result.get('success'):
                 prediction_id = save_prediction_log(
                     user_id=user_id,
@@ -150,12 +276,7 @@ def get_symptoms_list():
         }), 500
     
     try:
-        symptoms_list = predictor.get_all_symptoms()
-        return jsonify({
-            'success': True,
-            'symptoms': sorted(symptoms_list),  # Sort alphabetically
-            'total_count': len(symptoms_list)
-        })
+        return _static_json_response(_SYMPTOMS_JSON)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -214,12 +335,7 @@ def get_diseases_list():
         }), 500
     
     try:
-        diseases_list = predictor.get_all_diseases()
-        return jsonify({
-            'success': True,
-            'diseases': sorted(diseases_list),
-            'total_count': len(diseases_list)
-        })
+        return _static_json_response(_DISEASES_JSON)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -271,10 +387,11 @@ def validate_symptoms_endpoint():
         data = request.get_json()
         symptoms = data.get('symptoms', [])
         
-        if not isinstance(symptoms, list):
+        is_valid, message = validate_symptoms(symptoms)
+        if not is_valid:
             return jsonify({
                 'success': False,
-                'message': 'Symptoms must be provided as an array'
+                'message': message
             }), 400
         
         valid_symptoms = []
@@ -283,14 +400,17 @@ def validate_symptoms_endpoint():
         
         for symptom in symptoms:
             symptom = symptom.strip()
-            if symptom in predictor.symptoms_dict:
-                valid_symptoms.append(symptom)
+            known_symptom = _symptom_lower.get(symptom.lower())
+            if known_symptom is not None:
+                valid_symptoms.append(known_symptom)
             else:
                 invalid_symptoms.append(symptom)
-                # Find similar symptoms
-                similar = predictor.search_symptoms(symptom, 3)
-                if similar:
-                    suggestions[symptom] = similar
+        
+        # Find similar symptoms, searching once per distinct unknown symptom
+        for symptom in dict.fromkeys(invalid_symptoms):
+            similar = predictor.search_symptoms(symptom, 3)
+            if similar:
+                suggestions[symptom] = similar
         
         return jsonify({
             'success': True,
@@ -320,7 +440,7 @@ def ml_health_check():
             return jsonify({
                 'status': 'unhealthy',
                 'message': 'ML predictor not initialized',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': _iso_now()
             }), 503
         
         # Quick test prediction
@@ -334,7 +454,7 @@ def ml_health_check():
             'model_loaded': True,
             'symptoms_count': len(predictor.symptoms_dict),
             'diseases_count': len(predictor.diseases_list),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _iso_now()
         }), 200
         
     except Exception as e:
@@ -342,5 +462,5 @@ def ml_health_check():
             'status': 'unhealthy',
             'message': 'ML service error',
             'error': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _iso_now()
         }), 503
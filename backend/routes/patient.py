@@ -1,90 +1,186 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from utils.db_config import get_user_prediction_history, get_db, get_user_by_id
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from utils.db_config import get_user_prediction_history, get_db, get_user_by_id, on_prediction_logs_written, LOG_FLUSH_INTERVAL
+from utils.cache import TTLCache
+from utils.dates import utcnow
 from datetime import datetime, timedelta
+from bisect import bisect_right
+from functools import lru_cache
+from operator import itemgetter
 from bson import ObjectId
+from pymongo import DESCENDING
 
 patient_bp = Blueprint('patient', __name__)
 
+# Prediction log fields used by the recent activity feed and the dashboard
+ACTIVITY_PROJECTION = {'timestamp': 1, 'predicted_disease': 1, 'confidence': 1}
+DASHBOARD_PROJECTION = {'_id': 0, 'timestamp': 1, 'predicted_disease': 1, 'confidence': 1}
+DASHBOARD_RECENT_PREDICTIONS = 5
+
+# Dashboard payloads by user ID; kept short since other workers can't invalidate this process's copy
+DASHBOARD_CACHE_TTL = 10
+_dashboard_cache = TTLCache(maxsize=10000, ttl=DASHBOARD_CACHE_TTL)
+# Users whose new prediction logs were just written. Logs go out unacknowledged, so a dashboard
+# built right after the write may still miss them; those dashboards aren't cached.
+_dashboard_recently_invalidated = TTLCache(maxsize=10000, ttl=LOG_FLUSH_INTERVAL)
+
+# (seconds per unit, unit name) for 'time ago' strings; a month is 30 days and a year 12 months
+_TIME_AGO_UNITS = (
+    (60, 'minute'),
+    (3600, 'hour'),
+    (86400, 'day'),
+    (604800, 'week'),
+    (2592000, 'month'),
+    (31104000, 'year'),
+)
+_TIME_AGO_CUTOFFS = tuple(unit_seconds for unit_seconds, _ in _TIME_AGO_UNITS)
+
+def _current_user(user_id):
+    """The user fields the patient views need, from the token claims when it carries them"""
+    claims = get_jwt()
+    if 'created_at' in claims:
+        created_at = claims['created_at']
+        return {'_id': user_id, 'created_at': datetime.fromisoformat(created_at) if created_at else None}
+    
+    # Tokens issued before the claim was added
+    return get_user_by_id(user_id)
+
+def invalidate_dashboard_cache(user_id):
+    """Drop a user's cached dashboard, e.g. after they make a prediction"""
+    _dashboard_cache.pop(user_id)
+    _dashboard_recently_invalidated.set(user_id, True)
+
+@on_prediction_logs_written
+def _invalidate_dashboards(user_ids):
+    """Drop the cached dashboards of users whose new predictions the log writer has just stored"""
+    for user_id in user_ids:
+        invalidate_dashboard_cache(user_id)
+
+def _prediction_summary(user_id, week_ago, limit, projection=None):
+    """Prediction stats for a user plus their latest predictions, in one round trip"""
+    db = get_db()
+    if db is None:
+        return {'total': 0, 'weekly': 0, 'average_confidence': None, 'latest': []}
+    
+    latest = [{'$limit': limit}]
+    if projection:
+        latest.append({'$project': projection})
+    
+    # The match and sort use the (user_id, timestamp) index, since $facet sub-pipelines can't
+    facets = next(db.prediction_logs.aggregate([
+        {'$match': {'user_id': user_id}},
+        {'$sort': {'timestamp': DESCENDING}},
+        {'$facet': {
+            'total': [{'$count': 'count'}],
+            'weekly': [{'$match': {'timestamp': {'$gte': week_ago}}}, {'$count': 'count'}],
+            'confidence': [{'$group': {'_id': None, 'average': {'$avg': '$confidence'}}}],
+            'latest': latest
+        }}
+    ]), {})
+    
+    total = facets.get('total')
+    weekly = facets.get('weekly')
+    confidence = facets.get('confidence')
+    return {
+        'total': total[0]['count'] if total else 0,
+        'weekly': weekly[0]['count'] if weekly else 0,
+        'average_confidence': confidence[0]['average'] if confidence else None,
+        'latest': facets.get('latest', [])
+    }
+
+def _dashboard_data(user, summary, now):
+    """Dashboard stats and recent activity from a prediction summary"""
+    average_confidence = summary['average_confidence']
+    avg_accuracy = round(average_confidence * 100) if average_confidence is not None else 0
+    predictions = summary['latest'][:DASHBOARD_RECENT_PREDICTIONS]
+    
+    # Last prediction timestamp
+    last_prediction = 'Never'
+    if predictions:
+        last_prediction = (predictions[0].get('timestamp') or now).isoformat()
+    
+    # Generate recent activity
+    recent_activity = []
+    
+    # Add account creation if recent
+    if user.get('created_at'):
+        days_since_creation = (now - user['created_at']).days
+        if days_since_creation < 30:  # Show for first month
+            recent_activity.append({
+                'type': 'account',
+                'message': 'Account created successfully',
+                'time': user['created_at'],
+                'time_display': format_time_ago(user['created_at'], now)
+            })
+    
+    # Add recent predictions (latest 5)
+    for p in predictions:
+        timestamp = p.get('timestamp') or now
+        recent_activity.append({
+            'type': 'prediction',
+            'message': f"Predicted {p.get('predicted_disease', 'Unknown')} with {round((p.get('confidence') or 0) * 100)}% confidence",
+            'time': timestamp,
+            'time_display': format_time_ago(timestamp, now)
+        })
+    
+    # Sort by time (most recent first)
+    recent_activity.sort(key=itemgetter('time'), reverse=True)
+    
+    # Format for display (every activity time is a datetime until here)
+    for activity in recent_activity:
+        activity['time'] = activity['time'].isoformat()
+    
+    return {
+        'stats': {
+            'total_predictions': summary['total'],
+            'last_prediction': last_prediction,
+            'weekly_predictions': summary['weekly'],
+            'accuracy': avg_accuracy
+        },
+        'recent_activity': recent_activity[:10]  # Limit to 10 items
+    }
+
+def _format_prediction(p):
+    """JSON-ready copy of a prediction log, with the fields save_prediction_log writes"""
+    timestamp = p.get('timestamp')
+    return {
+        '_id': str(p['_id']),
+        'user_id': p.get('user_id'),
+        'symptoms': p.get('symptoms'),
+        'predicted_disease': p.get('predicted_disease'),
+        'confidence': p.get('confidence'),
+        'success': p.get('success'),
+        'timestamp': timestamp.isoformat() if timestamp is not None else None,
+        'metadata': p.get('metadata')
+    }
+
 @patient_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 def get_dashboard():
     """Get patient dashboard data with stats and recent activity"""
     try:
         user_id = get_jwt_identity()
-        user = get_user_by_id(user_id)
+        dashboard = _dashboard_cache.get(user_id)
+        if dashboard is not None:
+            return jsonify(dashboard)
+        
+        user = _current_user(user_id)
         
         if not user:
             return jsonify({
                 'success': False,
                 'message': 'User not found'
             }), 404
-            
-        # Get prediction history for stats
-        predictions = get_user_prediction_history(user_id, limit=50)
-        
-        # Calculate stats
-        total_predictions = len(predictions)
-        
-        # Last prediction timestamp
-        last_prediction = 'Never'
-        if total_predictions > 0:
-            last_prediction = predictions[0].get('timestamp', datetime.utcnow())
-        
-        # Weekly predictions
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        weekly_predictions = len([p for p in predictions if p.get('timestamp', datetime.utcnow()) >= week_ago])
-        
-        # Calculate accuracy (if available)
-        accuracy = 0
-        accuracy_count = 0
-        for p in predictions:
-            if 'confidence' in p:
-                accuracy += p['confidence']
-                accuracy_count += 1
-        
-        avg_accuracy = round((accuracy / accuracy_count) * 100) if accuracy_count > 0 else 0
         
-        # Generate recent activity
-        recent_activity = []
+        now = utcnow()
+        summary = _prediction_summary(
+            user_id, now - timedelta(days=7), DASHBOARD_RECENT_PREDICTIONS, DASHBOARD_PROJECTION
+        )
         
-        # Add account creation if recent
-        if user.get('created_at'):
-            days_since_creation = (datetime.utcnow() - user['created_at']).days
-            if days_since_creation < 30:  # Show for first month
-                recent_activity.append({
-                    'type': 'account',
-                    'message': 'Account created successfully',
-                    'time': user['created_at'],
-                    'time_display': format_time_ago(user['created_at'])
-                })
-        
-        # Add recent predictions (latest 5)
-        for p in predictions[:5]:
-            recent_activity.append({
-                'type': 'prediction',
-                'message': f"Predicted {p.get('predicted_disease', 'Unknown')} with {round((p.get('confidence', 0) * 100))}% confidence",
-                'time': p.get('timestamp', datetime.utcnow()),
-                'time_display': format_time_ago(p.get('timestamp', datetime.utcnow()))
-            })
-        
-        # Sort by time (most recent first)
-        recent_activity.sort(key=lambda x: x['time'], reverse=True)
-        
-        # Format for display (convert datetime objects to string)
-        for activity in recent_activity:
-            activity['time'] = activity['time'].isoformat() if isinstance(activity['time'], datetime) else activity['time']
-        
-        return jsonify({
-            'success': True,
-            'stats': {
-                'total_predictions': total_predictions,
-                'last_prediction': last_prediction.isoformat() if isinstance(last_prediction, datetime) else last_prediction,
-                'weekly_predictions': weekly_predictions,
-                'accuracy': avg_accuracy
-            },
-            'recent_activity': recent_activity[:10]  # Limit to 10 items
-        })
+        dashboard = {'success': True, **_dashboard_data(user, summary, now)}
+        if not _dashboard_recently_invalidated.get(user_id):
+            _dashboard_cache.set(user_id, dashboard)
+        return jsonify(dashboard)
         
     except Exception as e:
         return jsonify({
@@ -101,7 +197,7 @@ def get_history():
         limit = int(request.args.get('limit', 20))  # Default 20, can be adjusted via query params
         
         # Get user to check if they exist
-        user = get_user_by_id(user_id)
+        user = _current_user(user_id)
         if not user:
             return jsonify({
                 'success': False,
@@ -112,21 +208,7 @@ def get_history():
         predictions = get_user_prediction_history(user_id, limit=limit)
         
         # Format predictions for response
-        formatted_predictions = []
-        for p in predictions:
-            # Convert ObjectId to string for JSON serialization
-            if '_id' in p:
-                p['_id'] = str(p['_id'])
-            
-            # Format timestamp
-            if 'timestamp' in p and isinstance(p['timestamp'], datetime):
-                p['timestamp'] = p['timestamp'].isoformat()
-                
-            # Format user_id if present
-            if 'user_id' in p and not isinstance(p['user_id'], str):
-                p['user_id'] = str(p['user_id'])
-                
-            formatted_predictions.append(p)
+        formatted_predictions = [_format_prediction(p) for p in predictions]
         
         return jsonify({
             'success': True,
@@ -140,6 +222,44 @@ def get_history():
             'message': f'Failed to fetch history: {str(e)}'
         }), 500
 
+@patient_bp.route('/overview', methods=['GET'])
+@jwt_required()
+def get_overview():
+    """Get dashboard data and the first page of history with a single query"""
+    try:
+        user_id = get_jwt_identity()
+        limit = max(int(request.args.get('limit', 20)), 1)  # History page size
+        
+        user = _current_user(user_id)
+        if not user:
+            return jsonify({
+                'success': False,
+                'message': 'User not found'
+            }), 404
+        
+        # The dashboard's recent predictions are the head of the history page
+        now = utcnow()
+        summary = _prediction_summary(
+            user_id, now - timedelta(days=7), max(limit, DASHBOARD_RECENT_PREDICTIONS)
+        )
+        
+        predictions = [_format_prediction(p) for p in summary['latest'][:limit]]
+        
+        return jsonify({
+            'success': True,
+            **_dashboard_data(user, summary, now),
+            'history': {
+                'predictions': predictions,
+                'count': len(predictions)
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to fetch overview: {str(e)}'
+        }), 500
+
 @patient_bp.route('/recent-activity', methods=['GET'])
 @jwt_required()
 def get_recent_activity():
@@ -149,49 +269,54 @@ def get_recent_activity():
         limit = int(request.args.get('limit', 10))  # Default 10, can be adjusted
         
         # Get user info
-        user = get_user_by_id(user_id)
+        user = _current_user(user_id)
         if not user:
             return jsonify({
                 'success': False,
                 'message': 'User not found'
             }), 404
             
-        # Get prediction history
-        predictions = get_user_prediction_history(user_id, limit=limit)
+        now = utcnow()
+        
+        # Get prediction history, only the fields shown as activity
+        predictions = get_user_prediction_history(user_id, limit=limit, projection=ACTIVITY_PROJECTION)
         
         # Format activities
         activities = []
         
         # Add account creation activity if recent
         if user.get('created_at'):
-            days_since_creation = (datetime.utcnow() - user['created_at']).days
+            days_since_creation = (now - user['created_at']).days
             if days_since_creation < 30:  # Show for first month
                 activities.append({
                     'type': 'account',
                     'message': 'Account created successfully',
-                    'time': user['created_at'].isoformat(),
-                    'time_display': format_time_ago(user['created_at'])
+                    'time': user['created_at'],
+                    'time_display': format_time_ago(user['created_at'], now)
                 })
         
         # Add recent predictions
         for p in predictions:
-            timestamp = p.get('timestamp', datetime.utcnow())
+            timestamp = p.get('timestamp') or now
             activities.append({
                 'type': 'prediction',
                 'id': str(p.get('_id')),
                 'message': f"Predicted {p.get('predicted_disease', 'Unknown')}",
                 'details': f"Confidence: {round((p.get('confidence', 0) * 100))}%",
-                'time': timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
-                'time_display': format_time_ago(timestamp)
+                'time': timestamp,
+                'time_display': format_time_ago(timestamp, now)
             })
         
-        # Sort by time (most recent first)
-        activities.sort(key=lambda x: x['time'], reverse=True)
+        # Sort by time (most recent first), then format only the activities returned
+        activities.sort(key=itemgetter('time'), reverse=True)
+        activities = activities[:limit]
+        for activity in activities:
+            activity['time'] = activity['time'].isoformat()
         
         return jsonify({
             'success': True,
-            'activities': activities[:limit],
-            'count': len(activities[:limit])
+            'activities': activities,
+            'count': len(activities)
         })
         
     except Exception as e:
@@ -200,8 +325,8 @@ def get_recent_activity():
             'message': f'Failed to fetch recent activity: {str(e)}'
         }), 500
 
-def format_time_ago(timestamp):
-    """Format timestamp as a human-readable 'time ago' string"""
+def format_time_ago(timestamp, now=None):
+    """Format timestamp as a human-readable 'time ago' string, relative to now (default: current UTC time)"""
     if not timestamp:
         return 'Unknown time'
     
@@ -214,38 +339,20 @@ def format_time_ago(timestamp):
         except:
             return 'Unknown time'
     
-    now = datetime.utcnow()
-    diff = now - timestamp
-    
-    # Less than a minute
-    if diff.total_seconds() < 60:
+    # Whole seconds; sub-second precision never changes the result
+    diff = (now or utcnow()) - timestamp
+    seconds = diff.days * 86400 + diff.seconds
+    if seconds < 60:
         return 'Just now'
     
-    # Less than an hour
-    if diff.total_seconds() < 3600:
-        minutes = int(diff.total_seconds() / 60)
-        return f"{minutes} {'minute' if minutes == 1 else 'minutes'} ago"
-    
-    # Less than a day
-    if diff.total_seconds() < 86400:
-        hours = int(diff.total_seconds() / 3600)
-        return f"{hours} {'hour' if hours == 1 else 'hours'} ago"
-    
-    # Less than a week
-    if diff.total_seconds() < 604800:
-        days = int(diff.total_seconds() / 86400)
-        return f"{days} {'day' if days == 1 else 'days'} ago"
-    
-    # Less than a month
-    if diff.total_seconds() < 2592000:
-        weeks = int(diff.total_seconds() / 604800)
-        return f"{weeks} {'week' if weeks == 1 else 'weeks'} ago"
-    
-    # More than a month
-    months = int(diff.total_seconds() / 2592000)
-    if months < 12:
-        return f"{months} {'month' if months == 1 else 'months'} ago"
-    
-    # Years
-    years = int(months / 12)
-    return f"{years} {'year' if years == 1 else 'years'} ago"
+    # Every unit is a whole number of minutes, so the text only changes from one minute to the next
+    return _time_ago_text(seconds // 60)
+
+@lru_cache(maxsize=4096)
+def _time_ago_text(minutes):
+    """'Time ago' text for an age of at least one minute, in whole minutes"""
+    # Largest unit the age has reached
+    seconds = minutes * 60
+    unit_seconds, unit = _TIME_AGO_UNITS[bisect_right(_TIME_AGO_CUTOFFS, seconds) - 1]
+    count = seconds // unit_seconds
+    return f"{count} {unit if count == 1 else unit + 's'} ago"
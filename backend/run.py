@@ -76,7 +76,8 @@ def start_server():
     try:
         # Import and run the app
         from app import app
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        debug = os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true')
+        app.run(debug=debug, host='0.0.0.0', port=5000, threaded=True)
     except KeyboardInterrupt:
         print("\n🛑 Server stopped by user")
     except Exception as e:
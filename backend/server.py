@@ -5,12 +5,15 @@ Improved server script with better configuration and error handling
 
 from flask import Flask
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
 from routes.auth import auth_bp
 from routes.patient import patient_bp
 from routes.admin import admin_bp
 from routes.ml import ml_bp
-from utils.db_config import init_db, close_db
+from utils.db_config import init_db, get_db
+from utils.jwt_cache import CachedJWTManager
+from utils.json_provider import OrjsonProvider
+from utils.compression import init_compression
+from utils.cache import TTLCache
 import os
 from dotenv import load_dotenv
 from datetime import timedelta
@@ -26,10 +29,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Health and status responses are reused briefly, so polling doesn't hit the database each time
+STATUS_CACHE_TTL = 5
+_status_cache = TTLCache(maxsize=2, ttl=STATUS_CACHE_TTL)
+
 def create_app():
     """Application factory pattern"""
     app = Flask(__name__)
     
+    # Serialize responses with orjson, without pretty-printing
+    app.json = OrjsonProvider(app)
+    app.json.compact = True
+    
     # Enhanced CORS configuration to prevent timeout issues
     CORS(app, 
          origins=['http://localhost:3000', 'http://127.0.0.1:3000', 'http://localhost:3001'],
@@ -46,13 +57,14 @@ def create_app():
         JWT_ACCESS_TOKEN_EXPIRES=timedelta(hours=24),  # 24 hour token expiry
         SEND_FILE_MAX_AGE_DEFAULT=0,
         PERMANENT_SESSION_LIFETIME=timedelta(hours=24),
-        MAX_CONTENT_LENGTH=16 * 1024 * 1024,  # 16MB max file size
-        JSON_SORT_KEYS=False,  # Don't sort JSON keys
-        JSONIFY_PRETTYPRINT_REGULAR=True  # Pretty print JSON in development
+        MAX_CONTENT_LENGTH=16 * 1024 * 1024  # 16MB max file size
     )
     
+    # Gzip JSON responses
+    init_compression(app)
+    
     # Initialize JWT
-    jwt = JWTManager(app)
+    jwt = CachedJWTManager(app)
     
     # JWT error handlers
     @jwt.expired_token_loader
@@ -74,9 +86,6 @@ def create_app():
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
     
-    # Register database teardown
-    app.teardown_appcontext(close_db)
-    
     # Register Blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(patient_bp, url_prefix='/api/patient')  
@@ -86,12 +95,19 @@ def create_app():
     # Health check endpoints
     @app.route('/api/health', methods=['GET'])
     def health_check():
-        from utils.db_config import get_db
-        
         try:
             # Test database connection
-            db = get_db()
-            db_status = "connected" if db is not None else "disconnected"
+            db_status = _status_cache.get('health')
+            if db_status is None:
+                db_status = "disconnected"
+                db = get_db()
+                if db is not None:
+                    try:
+                        db.command('ping')
+                        db_status = "connected"
+                    except Exception as e:
+                        logger.warning(f"Database ping failed: {e}")
+                _status_cache.set('health', db_status)
             
             return {
                 "status": "healthy",
@@ -109,14 +125,16 @@ def create_app():
     @app.route('/api/status', methods=['GET'])
     def status_check():
         """Detailed status endpoint"""
-        from utils.db_config import get_db
-        
         try:
+            status = _status_cache.get('status')
+            if status is not None:
+                return status, 200
+            
             db = get_db()
-            user_count = db.users.count_documents({}) if db else 0
-            prediction_count = db.prediction_logs.count_documents({}) if db else 0
+            user_count = db.users.estimated_document_count() if db is not None else 0
+            prediction_count = db.prediction_logs.estimated_document_count() if db is not None else 0
             
-            return {
+            status = {
                 "status": "operational",
                 "database": {
                     "connected": db is not None,
@@ -129,7 +147,9 @@ def create_app():
                     "patient": "operational",
                     "admin": "operational"
                 }
-            }, 200
+            }
+            _status_cache.set('status', status)
+            return status, 200
         except Exception as e:
             logger.error(f"Status check error: {e}")
             return {"status": "degraded", "error": str(e)}, 500
@@ -152,18 +172,29 @@ def create_app():
 
 def main():
     """Main entry point"""
-    app = create_app()
-    
     # Get configuration
     host = os.getenv('HOST', '0.0.0.0')
     port = int(os.getenv('PORT', 5000))
-    debug = os.getenv('FLASK_ENV') == 'development'
+    debug = os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true')
     
     logger.info(f"Starting server on {host}:{port}")
     logger.info(f"Debug mode: {debug}")
     
+    if not debug:
+        # Production: hand the process over to gunicorn's multi-worker server (see gunicorn.conf.py)
+        backend_dir = os.path.dirname(os.path.abspath(__file__))
+        os.execvp('gunicorn', [
+            'gunicorn',
+            '-c', os.path.join(backend_dir, 'gunicorn.conf.py'),
+            '--chdir', backend_dir,
+            '-b', f'{host}:{port}',
+            'server:create_app()'
+        ])
+    
+    app = create_app()
+    
     try:
-        # Run the server
+        # Development server
         app.run(
             host=host,
             port=port,
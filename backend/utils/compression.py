@@ -0,0 +1,36 @@
+"""
+Gzip compression for JSON responses
+"""
+
+import gzip
+from flask import request
+
+# Bodies smaller than this aren't worth compressing
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 6
+
+def init_compression(app, min_size=COMPRESS_MIN_SIZE, level=COMPRESS_LEVEL):
+    """Gzip JSON responses for clients that accept it"""
+    
+    @app.after_request
+    def compress_response(response):
+        # Always vary on the header, so caches don't serve gzip to clients that can't read it
+        if response.mimetype == 'application/json':
+            response.vary.add('Accept-Encoding')
+        
+        if (response.mimetype != 'application/json'
+                or response.direct_passthrough
+                or response.status_code < 200 or response.status_code >= 300
+                or 'Content-Encoding' in response.headers):
+            return response
+        
+        if 'gzip' not in request.accept_encodings:
+            return response
+        
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        
+        response.set_data(gzip.compress(body, compresslevel=level))
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
@@ -0,0 +1,13 @@
+"""
+UTC time helpers
+"""
+
+from datetime import datetime, timezone
+
+def utcnow():
+    """Current UTC time as a naive datetime, the form pymongo stores and returns by default"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def utc_today():
+    """Start of the current UTC day, as a naive datetime"""
+    return utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
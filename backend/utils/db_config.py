@@ -1,30 +1,113 @@
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from flask import current_app, g
+from pymongo import MongoClient, ReplaceOne, ASCENDING, DESCENDING
+from pymongo.collation import Collation
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.write_concern import WriteConcern
+from flask import g
+from bson import ObjectId
+from bson.errors import InvalidId
 import os
-from datetime import datetime
+from datetime import timedelta
+from utils.cache import TTLCache
+from utils.dates import utcnow, utc_today
+import atexit
 import logging
+import queue
+import threading
+import time
+
+DEFAULT_DB_NAME = 'medicine_db'
+
+# System stats are recomputed off the request path every SYSTEM_STATS_REFRESH seconds;
+# entries outlive one missed refresh before requests fall back to querying directly
+SYSTEM_STATS_REFRESH = 30
+_stats_cache = TTLCache(maxsize=1, ttl=2 * SYSTEM_STATS_REFRESH)
+_stats_refresher = None
+_stats_refresher_lock = threading.Lock()
+# Days covered by the daily prediction series in the system stats
+DAILY_SERIES_DAYS = 30
+
+# Prediction logs are queued and inserted in batches by a background thread, off the request path;
+# a batch is written once it has LOG_BATCH_SIZE entries or LOG_FLUSH_INTERVAL seconds have passed
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL = 1.0
+_log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_log_writer = None
+_log_writer_lock = threading.Lock()
+# Called with the user IDs in each prediction log batch once it has been written
+_log_write_listeners = []
+
+# Case-insensitive comparisons for email lookups and user search; queries must use it to hit
+# the *_ci indexes and the unique email index
+CASE_INSENSITIVE = Collation(locale='en', strength=2)
+
+# Prediction logs older than this many days are removed by a TTL index; 0 (the default) keeps them forever
+PREDICTION_LOG_RETENTION_DAYS = int(os.getenv('PREDICTION_LOG_RETENTION_DAYS', 0))
+
+# Superseded indexes still present on databases created by older versions, dropped at startup
+LEGACY_INDEXES = {
+    'users': ('email_1', 'email_ci'),
+    # Prefixes of the (patient_id, created_at) and (user_id, timestamp) compound indexes
+    'prescriptions': ('patient_id_1',),
+    'prediction_logs': ('user_id_1',),
+}
+
+# Shared client (and its connection pool) reused across requests
+_client = None
+_db_name = None
+_client_lock = threading.Lock()
+
+def get_mongo_client():
+    """Get the shared MongoClient, creating it on first use"""
+    global _client, _db_name
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/medicine_db')
+                client = MongoClient(
+                    mongo_uri,
+                    maxPoolSize=50,
+                    minPoolSize=5,
+                    maxIdleTimeMS=300000,
+                    serverSelectionTimeoutMS=3000,
+                    # zstd needs the zstandard package; pymongo falls back to zlib without it
+                    compressors='zstd,zlib',
+                    w=1,
+                    readConcernLevel='local',
+                    retryWrites=True,
+                    retryReads=True,
+                    appname='medicine-api'
+                )
+                # Use pymongo's own URI parsing (handles SRV and multi-host URIs)
+                _db_name = client.get_default_database(DEFAULT_DB_NAME).name
+                _client = client
+    return _client
+
+def _reset_client_after_fork():
+    """Drop the parent's client in a forked worker (e.g. gunicorn with preload_app); MongoClient isn't fork-safe"""
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+def get_db_name():
+    """Get the database name used by the shared client"""
+    get_mongo_client()
+    return _db_name
 
 def init_db(app):
     """Initialize database connection and create indexes"""
     app.config['MONGO_URI'] = os.getenv('MONGO_URI', 'mongodb://localhost:27017/medicine_db')
     
+    # Registered once per app; releases each request's handle, never the shared client
+    app.teardown_appcontext(close_db)
+    
     # Test connection on startup
     try:
-        mongo_uri = app.config['MONGO_URI']
-        client = MongoClient(mongo_uri)
-        
-        # Handle different URI formats
-        if 'mongodb+srv://' in mongo_uri or mongo_uri.count('/') < 3:
-            # MongoDB Atlas or URI without database name
-            db_name = 'medicine_db'
-        else:
-            # Local MongoDB URI with database name
-            db_path = mongo_uri.split('/')[-1]
-            db_name = db_path.split('?')[0] if '?' in db_path else db_path
-            if not db_name:  # Empty string
-                db_name = 'medicine_db'
-        
-        db = client[db_name]  # Use bracket notation
+        # The database name is parsed from the URI once, when the shared client is created
+        db_name = get_db_name()
+        db = get_mongo_client()[db_name]
         # Test connection
         db.command('ping')
         print(f"✓ MongoDB connection successful (database: {db_name})")
@@ -40,24 +123,8 @@ def get_db():
     """Get database connection"""
     if 'db' not in g:
         try:
-            mongo_uri = current_app.config['MONGO_URI']
-            client = MongoClient(mongo_uri)
-            
-            # Handle different URI formats
-            if 'mongodb+srv://' in mongo_uri or mongo_uri.count('/') < 3:
-                # MongoDB Atlas or URI without database name
-                db_name = 'medicine_db'
-            else:
-                # Local MongoDB URI with database name
-                db_path = mongo_uri.split('/')[-1]
-                db_name = db_path.split('?')[0] if '?' in db_path else db_path
-                if not db_name:  # Empty string
-                    db_name = 'medicine_db'
-            
-            g.db = client[db_name]
-            
-            # Test the connection
-            g.db.command('ping')
+            # Reuses the shared client's connection pool; no per-request ping, /api/health does that
+            g.db = get_mongo_client()[get_db_name()]
             
         except Exception as e:
             logging.error(f"Database connection error: {e}")
@@ -65,64 +132,205 @@ def get_db():
     return g.db
 
 def close_db(e=None):
-    """Close database connection"""
-    db = g.pop('db', None)
-    if db is not None:
-        db.client.close()
+    """Release the request's database handle; the shared client stays open"""
+    g.pop('db', None)
 
 def create_indexes(db):
     """Create database indexes for better performance"""
     try:
         # Users collection indexes
-        db.users.create_index([("email", ASCENDING)], unique=True)
+        email_index_built = _create_email_index(db.users)
         db.users.create_index([("created_at", DESCENDING)])
+        db.users.create_index([("role", ASCENDING), ("created_at", DESCENDING)])
+        # Only users with a pending password reset carry these fields. Not a TTL index:
+        # that would delete the whole user document when the token expires.
+        db.users.create_index([("reset_token", ASCENDING), ("reset_token_expires", ASCENDING)], sparse=True)
+        for field in ('first_name', 'last_name'):
+            db.users.create_index([(field, ASCENDING)], name=f'{field}_ci', collation=CASE_INSENSITIVE)
         
-        # Prescriptions collection indexes
-        db.prescriptions.create_index([("patient_id", ASCENDING)])
-        db.prescriptions.create_index([("created_at", DESCENDING)])
+        # Prescriptions collection indexes (a patient's prescriptions, newest first)
+        db.prescriptions.create_index([("patient_id", ASCENDING), ("created_at", DESCENDING)])
         db.prescriptions.create_index([("predicted_disease", ASCENDING)])
         
         # Prediction logs collection indexes
-        db.prediction_logs.create_index([("timestamp", DESCENDING)])
-        db.prediction_logs.create_index([("user_id", ASCENDING)])
+        _create_timestamp_index(db.prediction_logs, PREDICTION_LOG_RETENTION_DAYS * 86400)
+        # Filter + newest-first sort patterns used by history, admin and analytics queries
+        db.prediction_logs.create_index([("user_id", ASCENDING), ("timestamp", DESCENDING)])
+        db.prediction_logs.create_index([("success", ASCENDING), ("timestamp", DESCENDING)])
+        db.prediction_logs.create_index([("predicted_disease", ASCENDING), ("timestamp", DESCENDING)])
+        # Serves the successful-predictions-by-disease grouping in the system stats
+        db.prediction_logs.create_index([("predicted_disease", ASCENDING)], partialFilterExpression={"success": True})
+        
+        # Dropped only after their replacements exist, so the old email indexes stay if the new one failed
+        for collection, names in LEGACY_INDEXES.items():
+            if collection == 'users' and not email_index_built:
+                continue
+            existing = db[collection].index_information()
+            for name in names:
+                if name in existing:
+                    db[collection].drop_index(name)
         
         print("✓ Database indexes created successfully")
     except Exception as e:
         print(f"✗ Failed to create indexes: {e}")
 
+def _create_email_index(users):
+    """Build the unique email index, returning False if existing emails keep it from building"""
+    try:
+        # Unique regardless of case; also serves the case-insensitive user search on email
+        users.create_index([("email", ASCENDING)], name='email_unique_ci', unique=True, collation=CASE_INSENSITIVE)
+        return True
+    except (DuplicateKeyError, OperationFailure) as e:
+        # Typically users whose emails differ only in case; the other indexes are still built
+        logging.error(f"Failed to create the case-insensitive unique email index, resolve duplicate emails: {e}")
+        return False
+
+def _create_timestamp_index(collection, expire_after_seconds):
+    """Index timestamp, as a TTL index when expire_after_seconds is set (it serves both sort directions)"""
+    indexes = collection.index_information()
+    if not expire_after_seconds:
+        collection.create_index([("timestamp", DESCENDING)])
+        if 'timestamp_ttl' in indexes:
+            collection.drop_index('timestamp_ttl')
+        return
+    
+    ttl_index = indexes.get('timestamp_ttl')
+    if ttl_index is None:
+        collection.create_index([("timestamp", ASCENDING)], name='timestamp_ttl', expireAfterSeconds=expire_after_seconds)
+    elif ttl_index.get('expireAfterSeconds') != expire_after_seconds:
+        # Changing the retention period in place; create_index would fail on the differing option
+        collection.database.command('collMod', collection.name, index={
+            'name': 'timestamp_ttl', 'expireAfterSeconds': expire_after_seconds
+        })
+    if 'timestamp_-1' in indexes:
+        collection.drop_index('timestamp_-1')
+
+def save_disease_lookups(lookups):
+    """Upsert one reference document per disease into disease_lookups"""
+    db = get_db()
+    if db is None:
+        return 0
+    
+    try:
+        # Created here rather than at app startup; only build_lookup.py --mongo uses the collection
+        db.disease_lookups.create_index([("disease", ASCENDING)], unique=True)
+        result = db.disease_lookups.bulk_write([
+            ReplaceOne({'disease': lookup['disease']}, lookup, upsert=True)
+            for lookup in lookups
+        ], ordered=False)
+        return result.upserted_count + result.modified_count
+        
+    except Exception as e:
+        logging.error(f"Failed to save disease lookups: {e}")
+        return 0
+
+def _insert_prediction_logs(batch):
+    """Insert a batch of prediction logs using the shared client"""
+    try:
+        db = get_mongo_client()[get_db_name()]
+        # Analytics logs are written unacknowledged: the writer doesn't wait for the server,
+        # at the cost of server-side insert errors (and writes lost in a crash) going unreported
+        logs = db.prediction_logs.with_options(write_concern=WriteConcern(w=0))
+        logs.insert_many(batch, ordered=False)
+    except Exception as e:
+        logging.error(f"Failed to save {len(batch)} prediction logs: {e}")
+        return
+    
+    user_ids = {entry.get('user_id') for entry in batch}
+    for listener in _log_write_listeners:
+        try:
+            listener(user_ids)
+        except Exception as e:
+            logging.error(f"Prediction log listener failed: {e}")
+
+def on_prediction_logs_written(listener):
+    """Register a callback taking the set of user IDs in each prediction log batch after it is written"""
+    _log_write_listeners.append(listener)
+    return listener
+
+def _write_prediction_logs():
+    """Background loop draining the prediction log queue in batches"""
+    while True:
+        batch = [_log_queue.get()]
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while len(batch) < LOG_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(_log_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        _insert_prediction_logs(batch)
+
+def _start_log_writer():
+    """Start the background log writer once per process"""
+    global _log_writer
+    with _log_writer_lock:
+        # is_alive() is also False in a forked worker, so each worker starts its own writer
+        if _log_writer is None or not _log_writer.is_alive():
+            _log_writer = threading.Thread(
+                target=_write_prediction_logs, name='prediction-log-writer', daemon=True
+            )
+            _log_writer.start()
+
+@atexit.register
+def _flush_prediction_logs():
+    """Write out whatever is still queued when the process exits"""
+    batch = []
+    while True:
+        try:
+            batch.append(_log_queue.get_nowait())
+        except queue.Empty:
+            break
+    if batch:
+        _insert_prediction_logs(batch)
+
 def save_prediction_log(user_id, symptoms, prediction_result, metadata=None):
-    """Save prediction to database for analytics"""
+    """Queue a prediction for the analytics log, returning its ID"""
     db = get_db()
     if db is None:
         return None
     
     try:
+        # The ID is assigned here so callers get it without waiting for the insert
         log_entry = {
+            '_id': ObjectId(),
             'user_id': user_id,
             'symptoms': symptoms,
             'predicted_disease': prediction_result.get('predicted_disease'),
             'confidence': prediction_result.get('confidence'),
             'success': prediction_result.get('success'),
-            'timestamp': datetime.utcnow(),
+            'timestamp': utcnow(),
             'metadata': metadata or {}
         }
         
-        result = db.prediction_logs.insert_one(log_entry)
-        return str(result.inserted_id)
+        _start_log_writer()
+        try:
+            _log_queue.put_nowait(log_entry)
+        except queue.Full:
+            # Drop the oldest entry rather than block the request
+            try:
+                _log_queue.get_nowait()
+            except queue.Empty:
+                pass
+            _log_queue.put_nowait(log_entry)
+        return str(log_entry['_id'])
         
     except Exception as e:
         logging.error(f"Failed to save prediction log: {e}")
         return None
 
-def get_user_prediction_history(user_id, limit=10):
-    """Get user's prediction history"""
+def get_user_prediction_history(user_id, limit=10, projection=None):
+    """Get user's prediction history, optionally limited to the projected fields (timestamps are BSON dates, so always datetimes)"""
     db = get_db()
     if db is None:
         return []
     
     try:
         cursor = db.prediction_logs.find(
-            {'user_id': user_id}
+            {'user_id': user_id},
+            projection
         ).sort('timestamp', DESCENDING).limit(limit)
         
         return list(cursor)
@@ -131,49 +339,95 @@ def get_user_prediction_history(user_id, limit=10):
         logging.error(f"Failed to get prediction history: {e}")
         return []
 
-def get_system_stats():
-    """Get system statistics for admin dashboard"""
-    db = get_db()
-    if db is None:
-        return {}
-    
+def facet_count(facets, name):
+    """Read a {'$count': 'count'} sub-pipeline result from a $facet document"""
+    result = facets[name]
+    return result[0]['count'] if result else 0
+
+def _compute_system_stats():
+    """Run the system statistics queries against the shared client"""
     try:
-        stats = {}
+        db = get_mongo_client()[get_db_name()]
+        today = utc_today()
+        week_ago = utcnow() - timedelta(days=7)
         
-        # Total users
-        stats['total_users'] = db.users.count_documents({})
+        # Unfiltered totals come from collection metadata instead of a scan
+        total_users = db.users.estimated_document_count()
+        total_predictions = db.prediction_logs.estimated_document_count()
         
-        # Total predictions
-        stats['total_predictions'] = db.prediction_logs.count_documents({})
+        # Counted on the (success, timestamp) index
+        successful_predictions = db.prediction_logs.count_documents({'success': True})
         
-        # Predictions today
-        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        stats['predictions_today'] = db.prediction_logs.count_documents({
-            'timestamp': {'$gte': today}
-        })
+        # Counted on the timestamp index
+        predictions_today = db.prediction_logs.count_documents({'timestamp': {'$gte': today}})
         
-        # Most common diseases
-        pipeline = [
+        # Predictions per UTC day over the last DAILY_SERIES_DAYS days, newest first (empty days are omitted);
+        # the leading $match reads just that window off the timestamp index
+        daily_predictions = list(db.prediction_logs.aggregate([
+            {'$match': {'timestamp': {'$gte': today - timedelta(days=DAILY_SERIES_DAYS - 1)}}},
+            {'$group': {
+                '_id': {'$dateTrunc': {'date': '$timestamp', 'unit': 'day'}},
+                'count': {'$sum': 1}
+            }},
+            {'$sort': {'_id': -1}}
+        ]))
+        
+        # Most common diseases; the leading $match and key sort let it read only the partial
+        # predicted_disease index on successful logs
+        common_diseases = list(db.prediction_logs.aggregate([
             {'$match': {'success': True}},
+            {'$sort': {'predicted_disease': ASCENDING}},
             {'$group': {'_id': '$predicted_disease', 'count': {'$sum': 1}}},
             {'$sort': {'count': -1}},
             {'$limit': 10}
-        ]
-        stats['common_diseases'] = list(db.prediction_logs.aggregate(pipeline))
+        ]))
         
         # Active users (last 7 days)
-        from datetime import timedelta
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        stats['active_users'] = db.users.count_documents({
-            'last_login': {'$gte': week_ago}
-        })
+        active_users = db.users.count_documents({'last_login': {'$gte': week_ago}})
         
-        return stats
+        return {
+            'total_users': total_users,
+            'total_predictions': total_predictions,
+            'successful_predictions': successful_predictions,
+            'predictions_today': predictions_today,
+            'common_diseases': common_diseases,
+            'daily_predictions': daily_predictions,
+            'active_users': active_users
+        }
         
     except Exception as e:
         logging.error(f"Failed to get system stats: {e}")
         return {}
 
+def _refresh_system_stats():
+    """Background loop keeping the cached system statistics hot"""
+    while True:
+        time.sleep(SYSTEM_STATS_REFRESH)
+        stats = _compute_system_stats()
+        if stats:
+            _stats_cache.set('stats', stats)
+
+def _start_stats_refresher():
+    """Start the background refresh thread once per process"""
+    global _stats_refresher
+    with _stats_refresher_lock:
+        if _stats_refresher is None or not _stats_refresher.is_alive():
+            _stats_refresher = threading.Thread(
+                target=_refresh_system_stats, name='system-stats-refresh', daemon=True
+            )
+            _stats_refresher.start()
+
+def get_system_stats():
+    """Get system statistics for admin dashboard (refreshed in the background)"""
+    stats = _stats_cache.get('stats')
+    if stats is None:
+        # Cold cache (first call, or the refresher couldn't reach the database)
+        stats = _compute_system_stats()
+        if stats:
+            _stats_cache.set('stats', stats)
+            _start_stats_refresher()
+    return stats
+
 # User management functions
 def create_user(user_data):
     """Create a new user"""
@@ -183,7 +437,7 @@ def create_user(user_data):
         return None
     
     try:
-        user_data['created_at'] = datetime.utcnow()
+        user_data['created_at'] = utcnow()
         user_data['last_login'] = None
         user_data['is_active'] = True
         
@@ -197,6 +451,50 @@ def create_user(user_data):
         logging.error(f"User data: {user_data}")
         return None
 
+def create_users(users_data):
+    """Create several users with a single bulk insert; returns {email: user_id} for those created"""
+    db = get_db()
+    if db is None:
+        logging.error("create_users: Database connection is None")
+        return {}
+    
+    now = utcnow()
+    for user_data in users_data:
+        user_data['created_at'] = now
+        user_data['last_login'] = None
+        user_data['is_active'] = True
+    
+    try:
+        db.users.insert_many(users_data, ordered=False)
+        failed = set()
+    except BulkWriteError as e:
+        # Unordered inserts keep going past failures (e.g. duplicate emails)
+        failed = {error['index'] for error in e.details.get('writeErrors', [])}
+        logging.error(f"Failed to create {len(failed)} of {len(users_data)} users: {e}")
+    except Exception as e:
+        logging.error(f"Failed to create users: {e}")
+        return {}
+    
+    return {
+        user_data['email']: str(user_data['_id'])
+        for i, user_data in enumerate(users_data) if i not in failed
+    }
+
+def get_existing_emails(emails):
+    """Get the subset of emails that already belong to a user"""
+    db = get_db()
+    if db is None:
+        return set()
+    
+    try:
+        return {
+            user['email']
+            for user in db.users.find({'email': {'$in': list(emails)}}, {'email': 1}, collation=CASE_INSENSITIVE)
+        }
+    except Exception as e:
+        logging.error(f"Failed to look up existing emails: {e}")
+        return set()
+
 def get_user_by_email(email):
     """Get user by email"""
     db = get_db()
@@ -204,37 +502,55 @@ def get_user_by_email(email):
         return None
     
     try:
-        return db.users.find_one({'email': email})
+        return db.users.find_one({'email': email}, collation=CASE_INSENSITIVE)
     except Exception as e:
         logging.error(f"Failed to get user by email: {e}")
         return None
 
 def get_user_by_id(user_id):
     """Get user by ID"""
+    # Malformed IDs can't match a user, so skip the round trip
+    try:
+        user_oid = ObjectId(user_id)
+    except (InvalidId, TypeError):
+        return None
+    
     db = get_db()
     if db is None:
         return None
     
     try:
-        from bson import ObjectId
-        return db.users.find_one({'_id': ObjectId(user_id)})
+        return db.users.find_one({'_id': user_oid})
     except Exception as e:
         logging.error(f"Failed to get user by ID: {e}")
         return None
 
-def update_user_login(user_id):
-    """Update user's last login time"""
+def update_user_login(user_id, password_hash=None):
+    """Update user's last login time (and upgraded password hash, if given)"""
+    try:
+        user_oid = ObjectId(user_id)
+    except (InvalidId, TypeError):
+        return False
+    
     db = get_db()
     if db is None:
         return False
     
     try:
-        from bson import ObjectId
-        result = db.users.update_one(
-            {'_id': ObjectId(user_id)},
-            {'$set': {'last_login': datetime.utcnow()}}
+        update = {'last_login': utcnow()}
+        users = db.users
+        if password_hash:
+            # Acknowledged, so a failed hash upgrade is reported
+            update['password_hash'] = password_hash
+        else:
+            # Unacknowledged: login doesn't wait on it, and a lost update only delays the
+            # last_login bump until the next login
+            users = users.with_options(write_concern=WriteConcern(w=0))
+        result = users.update_one(
+            {'_id': user_oid},
+            {'$set': update}
         )
-        return result.modified_count > 0
+        return result.matched_count > 0 if result.acknowledged else True
         
     except Exception as e:
         logging.error(f"Failed to update user login: {e}")
@@ -0,0 +1,35 @@
+"""
+orjson-backed JSON provider for Flask responses
+"""
+
+import orjson
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serialize jsonify() responses with orjson instead of the stdlib json module"""
+    
+    def dumps(self, obj, **kwargs):
+        # Datetimes go through Flask's default handler so the output format doesn't change
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+def _document_default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps_documents(obj):
+    """Serialize raw MongoDB documents to JSON bytes
+
+    ObjectIds become strings and naive datetimes are written in isoformat(),
+    so documents don't need a per-field formatting pass first.
+    """
+    return orjson.dumps(obj, default=_document_default, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,40 @@
+"""
+JWT manager that caches decoded tokens
+"""
+
+import hashlib
+import time
+from flask_jwt_extended import JWTManager
+from utils.cache import TTLCache
+
+class CachedJWTManager(JWTManager):
+    """JWTManager that skips signature verification for recently verified tokens
+    
+    Browser clients send the same token on every request, so the decoded
+    claims are kept for up to `ttl` seconds (never past the token's own
+    expiry) and reused instead of re-verifying the HS256 signature.
+    """
+    
+    def __init__(self, app=None, maxsize=8192, ttl=300, **kwargs):
+        self._decoded_tokens = TTLCache(maxsize=maxsize, ttl=ttl)
+        super().__init__(app, **kwargs)
+    
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        # Only plain verification of unexpired tokens is cached
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        
+        cache_key = hashlib.blake2b(encoded_token.encode(), digest_size=16).digest()
+        claims = self._decoded_tokens.get(cache_key)
+        if claims is not None:
+            return claims
+        
+        claims = super()._decode_jwt_from_config(encoded_token)
+        
+        ttl = self._decoded_tokens.ttl
+        if 'exp' in claims:
+            ttl = min(ttl, claims['exp'] - time.time())
+        if ttl > 0:
+            self._decoded_tokens.set(cache_key, claims, ttl=ttl)
+        
+        return claims
@@ -0,0 +1,27 @@
+"""
+Password hashing with argon2id, still accepting older werkzeug hashes
+"""
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from werkzeug.security import check_password_hash
+
+# RFC 9106 low-memory argon2id profile
+_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+def hash_password(password):
+    """Hash a password with argon2id"""
+    return _hasher.hash(password)
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash, returning (matches, needs_rehash)"""
+    if password_hash.startswith('$argon2'):
+        try:
+            _hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False, False
+        return True, _hasher.check_needs_rehash(password_hash)
+    
+    # Legacy werkzeug scrypt/pbkdf2 hash; upgrade it once the password is known to be right
+    matches = check_password_hash(password_hash, password)
+    return matches, matches
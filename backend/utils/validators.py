@@ -4,20 +4,22 @@ Input validation utilities
 
 def validate_symptoms(symptoms):
     """Validate symptoms input"""
-    if not isinstance(symptoms, list):
+    # Exact type checks: request JSON only ever decodes to plain lists and strings
+    if type(symptoms) is not list:
         return False, "Symptoms must be a list"
     
-    if len(symptoms) == 0:
+    count = len(symptoms)
+    if count == 0:
         return False, "At least one symptom is required"
     
-    if len(symptoms) > 20:
+    if count > 20:
         return False, "Maximum 20 symptoms allowed"
     
     for symptom in symptoms:
-        if not isinstance(symptom, str):
+        if type(symptom) is not str:
             return False, "All symptoms must be strings"
         
-        if len(symptom.strip()) == 0:
+        if not symptom.strip():
             return False, "Empty symptoms are not allowed"
     
     return True, "Valid"